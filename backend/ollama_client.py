@@ -1,31 +1,126 @@
-import requests
+import json
+import threading
+import time
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_HOST = "http://localhost:11434"
+OLLAMA_URL = f"{OLLAMA_HOST}/api/generate"
 DEFAULT_MODEL = "phi3"
 
+# Health checks are shared by every client talking to the same host
+_HEALTH_CACHE = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def build_session(retries=2, backoff=0.5, pool_size=10):
+    """
+    Session with a pooled connection adapter and retry/backoff on
+    connection errors and transient HTTP statuses. Read timeouts are
+    not retried so a slow model cannot multiply the request time.
+
+    requests is imported here rather than at module level, so importing
+    the client costs nothing until a session is actually needed.
+    """
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False
+    )
+
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=1,
+        pool_maxsize=pool_size
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
 
 class OllamaClient:
 
-    def __init__(self, model=DEFAULT_MODEL):
+    def __init__(self, model=DEFAULT_MODEL, host=OLLAMA_HOST, timeout=60,
+                 connect_timeout=3, retries=2, backoff=0.5, health_ttl=30,
+                 pool_size=10, session=None, keep_alive=None):
         self.model = model
+        self.host = host.rstrip("/")
+        self.timeout = (connect_timeout, timeout)
+        self.health_ttl = health_ttl
+        self.keep_alive = keep_alive
+        self.session = session or build_session(retries, backoff, pool_size)
+
+    def _payload(self, prompt, stream):
+        payload = {"model": self.model, "prompt": prompt, "stream": stream}
+        # How long Ollama keeps the model loaded after this request
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _timeout(self, limit):
+        """
+        Request timeout, shortened to `limit` seconds when given
+        """
+
+        if limit is None:
+            return self.timeout
+        return tuple(min(part, max(limit, 0.1)) for part in self.timeout)
 
     def is_server_running(self):
+        now = time.monotonic()
+
+        with _HEALTH_LOCK:
+            cached = _HEALTH_CACHE.get(self.host)
+            if cached and now - cached[0] < self.health_ttl:
+                return cached[1]
+
         try:
-            response = requests.get("http://localhost:11434")
+            response = self.session.get(self.host, timeout=self.timeout)
+            running = response.status_code == 200
+        except Exception:
+            running = False
+
+        with _HEALTH_LOCK:
+            _HEALTH_CACHE[self.host] = (now, running)
+
+        return running
+
+    def warm_up(self):
+        """
+        Ask Ollama to load the model, so the first real request does not
+        pay for it. A request without a prompt only loads the model.
+        """
+
+        payload = self._payload(None, False)
+        del payload["prompt"]
+
+        try:
+            response = self.session.post(
+                f"{self.host}/api/generate",
+                json=payload,
+                timeout=self.timeout
+            )
             return response.status_code == 200
-        except:
+        except Exception:
             return False
 
-    def generate(self, prompt):
+    def generate(self, prompt, timeout=None):
         try:
-            response = requests.post(
-                OLLAMA_URL,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=60
+            response = self.session.post(
+                f"{self.host}/api/generate",
+                json=self._payload(prompt, False),
+                timeout=self._timeout(timeout)
             )
 
             response.raise_for_status()
@@ -34,3 +129,39 @@ class OllamaClient:
 
         except Exception as e:
             return f"Ollama error: {str(e)}"
+
+    def generate_stream(self, prompt, timeout=None):
+        """
+        Yield response text chunks as Ollama produces them, parsed from
+        its newline-delimited JSON stream.
+
+        Failures are raised, not yielded, so an answer that breaks off
+        part way is never mistaken for a complete one.
+        """
+
+        with self.session.post(
+            f"{self.host}/api/generate",
+            json=self._payload(prompt, True),
+            timeout=self._timeout(timeout),
+            stream=True
+        ) as response:
+
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                chunk = json.loads(line)
+
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+
+        raise ConnectionError("Stream ended before the answer was complete")
+
+    def close(self):
+        self.session.close()
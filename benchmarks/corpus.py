@@ -0,0 +1,107 @@
+import os
+import random
+
+
+def generate_function(name, body_lines, rng):
+    """
+    A function exercising most rules: magic numbers, nested loops,
+    eval calls, bare excepts and unused locals
+    """
+
+    lines = [f"def {name}(a, b, c, d, e, f):"]
+
+    for i in range(body_lines):
+        kind = rng.randrange(6)
+        if kind == 0:
+            lines.append(f"    value_{i} = a * {rng.randrange(2, 1000)} + b")
+        elif kind == 1:
+            lines.append(f"    for i_{i} in range(c):")
+            lines.append(f"        for j_{i} in range(d):")
+            lines.append(f"            e = e + i_{i} * j_{i}")
+        elif kind == 2:
+            lines.append("    try:")
+            lines.append(f"        f = eval(str({rng.randrange(2, 50)}))")
+            lines.append("    except:")
+            lines.append("        f = 0")
+        elif kind == 3:
+            lines.append(f"    if a > {rng.randrange(2, 100)}:")
+            lines.append("        b = b + 1")
+        elif kind == 4:
+            lines.append(f"    while c > {rng.randrange(2, 10)}:")
+            lines.append("        c = c - 1")
+        else:
+            lines.append(f"    password_{i} = \"secret{i}\"")
+
+    lines.append("    return a + b + c + d + e + f")
+    return "\n".join(lines)
+
+
+def generate_module(functions=20, body_lines=15, seed=0):
+    rng = random.Random(seed)
+    parts = ["import os", "import sys", "import json", ""]
+
+    for index in range(functions):
+        parts.append(generate_function(f"function_{index}", body_lines, rng))
+        parts.append("")
+
+    parts.append("class Generated:")
+    for index in range(min(functions, 10)):
+        parts.append(f"    def method_{index}(self, x):")
+        parts.append(f"        return x * {index + 2}")
+    parts.append("")
+
+    return "\n".join(parts)
+
+
+# Python's parser allows at most 100 indentation levels; the enclosing
+# function and its body take two of them
+MAX_DEPTH = 98
+
+
+def generate_nested_module(depth=50):
+    """
+    One function with `depth` levels of nested for/if blocks
+    """
+
+    lines = ["def deep(items):", "    total = 0"]
+    indent = "    "
+
+    for level in range(depth):
+        if level % 2 == 0:
+            lines.append(f"{indent}for item_{level} in items:")
+        else:
+            lines.append(f"{indent}if item_{level - 1} > {level + 2}:")
+        indent += "    "
+
+    lines.append(f"{indent}total = total + {depth}")
+    lines.append("    return total")
+    lines.append("")
+
+    return "\n".join(lines)
+
+
+def write_corpus(directory, files=50, functions=20, body_lines=15, large_functions=0, depth=0):
+    """
+    Write a synthetic corpus and return the list of file paths.
+    Optionally adds one very large module and one deeply nested one.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    def write(name, code):
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(code)
+        paths.append(path)
+
+    for index in range(files):
+        write(f"module_{index}.py", generate_module(functions, body_lines, seed=index))
+
+    if large_functions:
+        write("large_module.py", generate_module(large_functions, body_lines, seed=files))
+
+    if depth:
+        write("nested_module.py", generate_nested_module(depth))
+
+    return paths
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def echo_responder(payload):
+    """
+    Answer in the format the prompt asks for: one JSON object per
+    single-issue prompt, a JSON array for a batch prompt
+    """
+
+    prompt = payload.get("prompt", "")
+    issues = [
+        line[len("Issue: "):].strip()
+        for line in prompt.splitlines()
+        if line.startswith("Issue: ")
+    ] or ["unknown"]
+
+    answers = [
+        {
+            "issue": issue,
+            "severity": "INFO",
+            "feedback": f"Fake feedback for a {len(prompt)} character prompt."
+        }
+        for issue in issues
+    ]
+
+    if "JSON array" in prompt:
+        return json.dumps(answers)
+    return json.dumps(answers[0])
+
+
+class FakeOllamaServer:
+    """
+    Minimal local stand-in for the Ollama HTTP API, for tests and
+    benchmarks. Serves the health check on / and /api/generate with an
+    injectable per-request latency and response function.
+
+        with FakeOllamaServer(latency=0.05) as server:
+            client = OllamaClient(host=server.url)
+    """
+
+    def __init__(self, latency=0.0, responder=echo_responder, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.responder = responder
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, payload):
+                """
+                Newline-delimited JSON chunks over chunked encoding, with
+                the latency spread evenly across the chunks
+                """
+
+                words = fake.responder(payload).split(" ")
+                delay = fake.latency / max(len(words), 1)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                chunks = [{"response": word + " ", "done": False} for word in words]
+                chunks.append({"response": "", "done": True})
+
+                for chunk in chunks:
+                    if delay:
+                        time.sleep(delay)
+                    data = (json.dumps({"model": payload.get("model"), **chunk}) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_GET(self):
+                if self.path == "/":
+                    self._send(200, "Ollama is running", "text/plain")
+                else:
+                    self._send(404, "{}")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                with fake._lock:
+                    fake.requests.append(payload)
+
+                if self.path != "/api/generate":
+                    self._send(404, "{}")
+                    return
+
+                if payload.get("stream"):
+                    self._send_stream(payload)
+                    return
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                self._send(200, json.dumps({
+                    "model": payload.get("model"),
+                    "response": fake.responder(payload),
+                    "done": True
+                }))
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
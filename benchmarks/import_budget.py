@@ -0,0 +1,107 @@
+"""
+Import-time budget for the CLI.
+
+    python -m benchmarks.import_budget --budget-ms 80
+
+Starts fresh interpreters that only import `reviewer`, subtracts the
+cost of a bare interpreter start and fails (exit status 1) when the
+median exceeds the budget, or when any module that should load lazily
+was pulled in at import time.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+DEFAULT_BUDGET_MS = 80
+
+# Heavy dependencies that only specific commands need; importing the
+# CLI must not load any of them
+LAZY_MODULES = (
+    "requests",
+    "urllib3",
+    "http.client",
+    "multiprocessing",
+    "concurrent.futures.process",
+    "importlib.metadata",
+    "subprocess",
+    "modules.module2_ollama",
+    "backend.ollama_client",
+    "modules.daemon",
+    "pandas",
+    "numpy",
+    "plotly"
+)
+
+_LOADED_PROBE = (
+    "import sys, json, reviewer; "
+    "print(json.dumps([name for name in {names!r} if name in sys.modules]))"
+)
+
+
+def _start_ms(code, runs):
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def measure_import(runs=7):
+    baseline = _start_ms("pass", runs)
+    with_import = _start_ms("import reviewer", runs)
+
+    probe = subprocess.run(
+        [sys.executable, "-c", _LOADED_PROBE.format(names=LAZY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    return {
+        "baseline_ms": baseline,
+        "import_ms": max(with_import - baseline, 0.0),
+        "eager_modules": json.loads(probe.stdout)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the CLI import-time budget")
+
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum median cost of 'import reviewer', in milliseconds")
+    parser.add_argument("--runs", type=int, default=7, help="Interpreter starts per measurement")
+
+    args = parser.parse_args(argv)
+    result = measure_import(args.runs)
+    result["budget_ms"] = args.budget_ms
+
+    print(json.dumps(result, indent=2))
+
+    if result["eager_modules"]:
+        print(
+            f"Imported eagerly: {', '.join(result['eager_modules'])}",
+            file=sys.stderr
+        )
+        return 1
+
+    if result["import_ms"] > args.budget_ms:
+        print(
+            f"Import took {result['import_ms']:.1f} ms, over the "
+            f"{args.budget_ms:.0f} ms budget",
+            file=sys.stderr
+        )
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
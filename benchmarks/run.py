@@ -0,0 +1,198 @@
+"""
+Benchmark harness for the reviewer pipeline.
+
+    python -m benchmarks.run --files 200 --output bench.json
+
+Times each stage separately over a synthetic corpus and prints (or
+writes) the results as JSON so runs can be compared over time.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import MAX_DEPTH, write_corpus
+from modules.module1 import detect_issues_ast, issue_counts, issue_scopes, issue_spans, analyze_code
+from modules.module2_ollama import build_results, build_results_with_ai, get_client
+from modules.module3 import aggregate_module3_results
+from modules.config_loader import DEFAULT_CONFIG
+from benchmarks.fake_ollama import FakeOllamaServer
+import reviewer
+
+
+def measure(function, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = function()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "runs": repeat,
+        "items": items,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "max_s": max(timings),
+        "per_item_ms": min(timings) * 1000 / max(items, 1)
+    }
+
+
+def nesting_depth(value):
+    depth = int(value)
+    if not 0 <= depth <= MAX_DEPTH:
+        raise argparse.ArgumentTypeError(f"must be between 0 and {MAX_DEPTH}, Python's nesting limit")
+    return depth
+
+
+def run_benchmarks(args):
+    workdir = tempfile.mkdtemp(prefix="codereviewer_bench_")
+
+    try:
+        return _run_in(workdir, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_in(workdir, args):
+    paths = write_corpus(
+        workdir,
+        files=args.files,
+        functions=args.functions,
+        body_lines=args.body_lines,
+        large_functions=args.large_functions,
+        depth=args.depth
+    )
+
+    sources = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            sources[path] = file.read()
+
+    analyses = {path: analyze_code(code) for path, code in sources.items()}
+    offline = {path: build_results(list(issue_counts(analysis[0]))) for path, analysis in analyses.items()}
+    config = {**DEFAULT_CONFIG, "cache": False}
+
+    results = {}
+
+    def detect():
+        for code in sources.values():
+            detect_issues_ast(code)
+        return len(sources)
+
+    def scan_metrics():
+        for path in paths:
+            reviewer.collect_scan(path, config)
+        return len(paths)
+
+    def offline_results():
+        for analysis in analyses.values():
+            build_results(list(issue_counts(analysis[0])))
+        return len(analyses)
+
+    def aggregate():
+        for path, file_results in offline.items():
+            aggregate_module3_results(file_results, path)
+        return len(offline)
+
+    def export():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path, file_results in offline.items():
+                reviewer.export_csv(file_results, path)
+        return len(offline)
+
+    results["detect_issues_ast"] = measure(detect, args.repeat)
+    results["scan_file_metrics"] = measure(scan_metrics, args.repeat)
+    results["build_results"] = measure(offline_results, args.repeat)
+    results["aggregate_module3_results"] = measure(aggregate, args.repeat)
+    results["export_csv"] = measure(export, args.repeat)
+
+    if args.ai_files:
+        ai_paths = paths[:args.ai_files]
+
+        with FakeOllamaServer(latency=args.ai_latency) as server:
+            client = get_client(host=server.url, pool_size=args.ai_concurrency)
+
+            def ai_results():
+                requests = 0
+                for path in ai_paths:
+                    records, _ = analyses[path]
+                    issues = list(issue_counts(records))
+                    build_results_with_ai(
+                        issues,
+                        sources[path],
+                        concurrency=args.ai_concurrency,
+                        batch=args.ai_batch,
+                        client=client,
+                        spans=issue_spans(records),
+                        scopes=issue_scopes(records)
+                    )
+                    requests += len(issues)
+                return requests
+
+            sent = len(server.requests)
+            results["build_results_with_ai"] = measure(ai_results, args.repeat)
+            results["build_results_with_ai"]["fake_latency_s"] = args.ai_latency
+            # HTTP requests per run; with --ai-batch, one per file unless
+            # answers had to be retried issue by issue
+            results["build_results_with_ai"]["http_requests"] = (
+                (len(server.requests) - sent) // args.repeat
+            )
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus_files": len(paths),
+            "corpus_bytes": sum(len(code) for code in sources.values()),
+            "parameters": vars(args)
+        },
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the code reviewer")
+
+    parser.add_argument("--files", type=int, default=50, help="Synthetic modules to generate")
+    parser.add_argument("--functions", type=int, default=20, help="Functions per module")
+    parser.add_argument("--body-lines", type=int, default=15, help="Statements per function")
+    parser.add_argument("--large-functions", type=int, default=500,
+                        help="Functions in one extra very large module (0 to skip)")
+    parser.add_argument("--depth", type=nesting_depth, default=50,
+                        help="Nesting depth of one extra deeply nested module (0 to skip)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark")
+    parser.add_argument("--ai-files", type=int, default=3,
+                        help="Files sent through the fake Ollama server (0 to skip)")
+    parser.add_argument("--ai-latency", type=float, default=0.05,
+                        help="Injected fake Ollama latency per request, in seconds")
+    parser.add_argument("--ai-concurrency", type=int, default=4)
+    parser.add_argument("--ai-batch", action="store_true")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+
+    args = parser.parse_args(argv)
+    report = run_benchmarks(args)
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
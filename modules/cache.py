@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from modules.rules import rule_set_version
+
+
+CACHE_VERSION = 4
+
+# Settings that change how the cache behaves but not what gets computed
+RUNTIME_KEYS = {
+    "cache", "cache_dir", "cache_max_mb", "exclude_paths", "ai_concurrency", "stream",
+    "ollama_host", "ollama_timeout", "ollama_retries", "ollama_backoff",
+    "ollama_health_ttl", "profile", "include_paths", "max_file_size_kb", "skip_generated",
+    "project_summary", "pipeline_depth", "feedback_reuse", "fail_fast",
+    "severity_threshold", "ollama_keep_alive", "ollama_warm_up", "ai_deadline_s"
+}
+
+# Kinds holding AST analysis, which depends on the rule set alone
+ANALYSIS_KINDS = {"analysis", "stat", "fragment"}
+
+_OPEN_CACHES = {}
+
+# Caches a forked worker inherited from its parent. They stay referenced
+# so the child never uses or closes the parent's SQLite connections.
+_INHERITED = []
+
+
+def cache_key(kind, code, config, model=None, extra=None):
+    """
+    Build a key from the file content hash, the active rule set and config,
+    and (for AI results) the model name. Analysis kinds are keyed on the
+    rule set only, so LLM settings such as the model leave them valid.
+    """
+
+    if kind in ANALYSIS_KINDS:
+        settings = {"rules": rule_set_version(config.get("rules"))}
+    else:
+        settings = {k: v for k, v in config.items() if k not in RUNTIME_KEYS}
+
+    hasher = hashlib.sha256()
+    hasher.update(f"{CACHE_VERSION}:{kind}:{model or ''}\0".encode("utf-8"))
+    hasher.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(code.encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+class NullCache:
+    """
+    Stand-in used for --no-cache; never stores anything
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def prune(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ResultCache:
+    """
+    Persistent, size-bounded LRU cache of JSON-serialisable results.
+
+    Entries live in a single SQLite file so several worker processes can
+    share it safely. Least recently used entries are evicted on prune()
+    once the stored payload exceeds max_bytes. One connection is shared
+    by all threads of a process, serialized by a lock.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "results.sqlite3")
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self._db.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time())
+            )
+
+    def prune(self):
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall()
+
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+
+        self._db.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_cache(config):
+    """
+    Return the cache for this process, opening it on first use
+    """
+
+    if not config.get("cache", True):
+        return NullCache()
+
+    # Absolute, so a daemon serving several projects keeps them apart
+    cache_dir = os.path.abspath(config.get("cache_dir", ".codereviewer_cache"))
+
+    if cache_dir not in _OPEN_CACHES:
+        max_bytes = int(config.get("cache_max_mb", 64) * 1024 * 1024)
+        _OPEN_CACHES[cache_dir] = ResultCache(cache_dir, max_bytes)
+
+    return _OPEN_CACHES[cache_dir]
+
+
+def forget_inherited_caches():
+    """
+    Process pool initializer. A SQLite connection must not be used across
+    fork, so a forked worker sets the parent's caches aside and opens its
+    own on first use.
+    """
+
+    _INHERITED.extend(_OPEN_CACHES.values())
+    _OPEN_CACHES.clear()
@@ -1,20 +1,54 @@
-import tomllib
+import copy
 import os
+import tomllib
 
 DEFAULT_CONFIG = {
     "severity_threshold": "INFO",
     "exclude_paths": [],
-    "rules": []
+    "include_paths": ["*.py"],
+    "max_file_size_kb": 1024,
+    "skip_generated": False,
+    "rules": [],
+    "model": "phi3",
+    "ai_concurrency": 4,
+    "ai_batch": False,
+    "pipeline_depth": 2,
+    "feedback_reuse": True,
+    "stream": True,
+    "context_window": 5,
+    "max_context_tokens": 1500,
+    "ollama_host": "http://localhost:11434",
+    "ollama_timeout": 60,
+    "ollama_retries": 2,
+    "ollama_backoff": 0.5,
+    "ollama_health_ttl": 30,
+    "ollama_keep_alive": "10m",
+    "ollama_warm_up": True,
+    "ai_deadline_s": 0,
+    "cache": True,
+    "cache_dir": ".codereviewer_cache",
+    "cache_max_mb": 64
 }
 
 
+# Parsed [tool.codereviewer] sections by (path, mtime), so a long-running
+# process re-reads pyproject.toml only after it changes
+_LOADED = {}
+
+
 def load_config():
-    config_path = "pyproject.toml"
+    config_path = os.path.abspath("pyproject.toml")
+
+    try:
+        mtime = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        return dict(DEFAULT_CONFIG)
 
-    if not os.path.exists(config_path):
-        return DEFAULT_CONFIG
+    key = (config_path, mtime)
 
-    with open(config_path, "rb") as f:
-        data = tomllib.load(f)
+    if key not in _LOADED:
+        with open(config_path, "rb") as f:
+            data = tomllib.load(f)
+        _LOADED[key] = data.get("tool", {}).get("codereviewer", {})
 
-    return data.get("tool", {}).get("codereviewer", DEFAULT_CONFIG)
+    return {**DEFAULT_CONFIG, **copy.deepcopy(_LOADED[key])}
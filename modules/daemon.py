@@ -0,0 +1,319 @@
+"""
+Long-running reviewer daemon and its thin client.
+
+    python reviewer.py serve                 # start the daemon
+    python -m modules.daemon scan app.py     # forward a command to it
+
+The daemon keeps the loaded config, rule engines, result caches and
+pooled Ollama sessions warm between invocations. The client imports
+only the standard library and falls back to running the command
+in-process when no daemon is listening.
+
+The daemon runs arbitrary reviewer commands as its user, so it listens
+on a Unix socket in the project's cache_dir that only that user can
+connect to, never on a TCP port.
+"""
+
+import http.client
+import json
+import os
+import socket
+import socketserver
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler
+
+
+SOCKET_NAME = "daemon.sock"
+
+# How long the client waits for a connection before falling back
+CONNECT_TIMEOUT = 0.2
+
+
+class _StreamWriter:
+    """
+    File-like object forwarding everything written to it to the client
+    as one JSON line per write, tagged with the stream name
+    """
+
+    def __init__(self, wfile, stream):
+        self._wfile = wfile
+        self._stream = stream
+
+    def write(self, text):
+        if text:
+            line = json.dumps({"stream": self._stream, "text": text}) + "\n"
+            self._wfile.write(line.encode("utf-8"))
+            self._wfile.flush()
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_in_daemon(argv, cwd, stdout, stderr):
+    """
+    Run one reviewer command as if invoked from `cwd`, writing its output
+    to the given streams. Returns the exit code.
+    """
+
+    import reviewer
+    from modules.module1 import set_profiling
+    from modules.profiler import PROFILER
+
+    previous = os.getcwd()
+
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                return _exit_code(reviewer.main(argv))
+            except SystemExit as exit:
+                return _exit_code(exit.code)
+            except Exception as error:
+                print(f"Error: {error}", file=sys.stderr)
+                return 1
+    finally:
+        os.chdir(previous)
+
+        # Profiling is opt-in per invocation; do not leak it into the next
+        if PROFILER.enabled:
+            set_profiling(False)
+            PROFILER.reset()
+
+
+def _handler_class():
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.0: the response body ends when the connection closes,
+        # so output can be streamed without knowing its length up front
+        protocol_version = "HTTP/1.0"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/":
+                self._send_json(200, {"status": "ok", "pid": os.getpid()})
+            else:
+                self._send_json(404, {})
+
+        def do_POST(self):
+            if self.headers.get_content_type() != "application/json":
+                self._send_json(415, {"error": "expected application/json"})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/shutdown":
+                self._send_json(200, {"status": "stopping"})
+                self.server.stopping = True
+                return
+
+            if self.path != "/run":
+                self._send_json(404, {})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+
+            code = run_in_daemon(
+                payload.get("argv", []),
+                payload.get("cwd") or os.getcwd(),
+                _StreamWriter(self.wfile, "stdout"),
+                _StreamWriter(self.wfile, "stderr")
+            )
+
+            self.wfile.write((json.dumps({"exit_code": code}) + "\n").encode("utf-8"))
+
+    return Handler
+
+
+def socket_path(cache_dir):
+    return os.path.join(cache_dir, SOCKET_NAME)
+
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+
+    def server_bind(self):
+        # Owner-only from the moment the socket file exists
+        previous = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(previous)
+        os.chmod(self.server_address, 0o600)
+
+
+def _remove_stale_socket(path):
+    """
+    Remove a socket file left by a daemon that died; raise if one is
+    still listening on it
+    """
+
+    if not os.path.exists(path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"a daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def serve(cache_dir):
+    """
+    Serve reviewer commands until a /shutdown request arrives.
+
+    Requests are handled one at a time: each changes the working
+    directory and redirects stdout for its duration, both of which are
+    process-wide.
+    """
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("The daemon needs Unix domain sockets, not available here.", file=sys.stderr)
+        return 1
+
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    path = os.path.abspath(socket_path(cache_dir))
+    _remove_stale_socket(path)
+
+    server = _UnixHTTPServer(path, _handler_class())
+    server.stopping = False
+
+    print(f"codereviewer daemon listening on {path}", file=sys.stderr)
+
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+    return 0
+
+
+# ===================================
+# CLIENT
+# ===================================
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout=CONNECT_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def forward(argv, path):
+    """
+    Run `argv` on the daemon listening on `path`, relaying its output as
+    it arrives. Returns the exit code, or None when no daemon is listening.
+    """
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    connection = _UnixHTTPConnection(path)
+
+    try:
+        connection.connect()
+    except OSError:
+        return None
+
+    # Commands run as long as they need once connected
+    connection.sock.settimeout(None)
+
+    body = json.dumps({"argv": list(argv), "cwd": os.getcwd()})
+    connection.request("POST", "/run", body, {"Content-Type": "application/json"})
+    response = connection.getresponse()
+
+    code = 1
+    for line in response:
+        message = json.loads(line)
+
+        if "exit_code" in message:
+            code = message["exit_code"]
+            break
+
+        stream = sys.stderr if message["stream"] == "stderr" else sys.stdout
+        stream.write(message["text"])
+        stream.flush()
+
+    connection.close()
+    return code
+
+
+def stop(path):
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+
+    connection = _UnixHTTPConnection(path)
+
+    try:
+        connection.request("POST", "/shutdown", "{}", {"Content-Type": "application/json"})
+        connection.getresponse().read()
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+    return True
+
+
+def main(argv=None):
+    from modules.config_loader import load_config
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    path = socket_path(load_config()["cache_dir"])
+
+    if argv == ["stop"]:
+        return 0 if stop(path) else 1
+
+    code = forward(argv, path)
+
+    if code is None:
+        import reviewer
+
+        try:
+            return _exit_code(reviewer.main(argv))
+        except SystemExit as exit:
+            return _exit_code(exit.code)
+
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import ast
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+
+from modules.rules import rule_severity
+
+
+def node_span(node):
+    return node.lineno, getattr(node, "end_lineno", None) or node.lineno
+
+
+def remember_span(spans, name, span):
+    """
+    Keep the earliest span seen for a name, independent of walk order
+    """
+
+    current = spans.get(name)
+    if current is None or span < current:
+        spans[name] = span
+
+
+def shift_span(span, offset):
+    return [span[0] + offset, span[1] + offset]
+
+
+@dataclass(frozen=True, slots=True)
+class Issue:
+    """
+    One occurrence of a rule violation.
+
+    Slotted and immutable: no per-instance dict, hashable for
+    deduplication. Serialised as a plain row (to_row / from_row) for
+    caches and process boundaries.
+
+    The first located occurrence of each rule, the one whose context is
+    sent to the LLM, also carries its structural `fingerprint` and the
+    (start, end) `scope` of the function or class around it.
+    """
+
+    rule: str
+    line: int = None
+    col: int = None
+    end_line: int = None
+    end_col: int = None
+    severity: str = None
+    symbol: str = None
+    fingerprint: str = None
+    scope: tuple = None
+
+    def to_row(self):
+        return [
+            self.rule, self.line, self.col, self.end_line, self.end_col, self.severity,
+            self.symbol, self.fingerprint, list(self.scope) if self.scope else None
+        ]
+
+    @classmethod
+    def from_row(cls, row):
+        issue = cls(*row)
+        if issue.scope is not None:
+            issue = replace(issue, scope=tuple(issue.scope))
+        return issue
+
+    def shifted(self, offset):
+        if self.line is None:
+            return self
+        return replace(
+            self,
+            line=self.line + offset,
+            end_line=self.end_line + offset,
+            scope=tuple(shift_span(self.scope, offset)) if self.scope else None
+        )
+
+    def sort_key(self):
+        return (self.line or 0, self.col or 0, self.rule)
+
+
+class AnalysisContext:
+    """
+    Mutable state shared by every rule and collector during one walk.
+
+    Rules keep cross-node state in `state`, whose values are either sets
+    of names or dicts mapping names to (lineno, end_lineno) spans. That
+    contract lets per-function fragments be cached and merged back.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.metrics = defaultdict(int)
+        self.state = {}
+
+    def report(self, rule, node=None, span=None, symbol=None):
+        """
+        Record an issue, located either by the AST node that triggered
+        it (with columns) or by an explicit (lineno, end_lineno) span
+        """
+
+        if node is not None:
+            record = Issue(
+                rule,
+                node.lineno,
+                node.col_offset,
+                getattr(node, "end_lineno", None) or node.lineno,
+                getattr(node, "end_col_offset", None),
+                rule_severity(rule),
+                symbol
+            )
+        elif span is not None:
+            record = Issue(rule, span[0], None, span[1], None, rule_severity(rule), symbol)
+        else:
+            record = Issue(rule, severity=rule_severity(rule), symbol=symbol)
+
+        self.records.append(record)
+
+    def count(self, metric, amount=1):
+        self.metrics[metric] += amount
+
+    def export(self, offset=0):
+        """
+        Serialise this context as a JSON-friendly fragment with line
+        numbers made relative to `offset`
+        """
+
+        state = {}
+        for key, value in self.state.items():
+            if isinstance(value, dict):
+                state[key] = {name: shift_span(span, -offset) for name, span in value.items()}
+            else:
+                state[key] = sorted(value)
+
+        return {
+            "records": [record.shifted(-offset).to_row() for record in self.records],
+            "metrics": dict(self.metrics),
+            "state": state
+        }
+
+    def merge(self, fragment, offset=0):
+        """
+        Fold an exported fragment back in, shifting its lines by `offset`
+        """
+
+        self.records.extend(
+            Issue.from_row(row).shifted(offset) for row in fragment["records"]
+        )
+
+        for metric, amount in fragment["metrics"].items():
+            self.metrics[metric] += amount
+
+        for key, value in fragment["state"].items():
+            if isinstance(value, dict):
+                spans = self.state.setdefault(key, {})
+                for name, span in value.items():
+                    remember_span(spans, name, tuple(shift_span(span, offset)))
+            else:
+                self.state.setdefault(key, set()).update(value)
+
+
+def handler_label(handler):
+    return "rule:" + handler.__name__.lstrip("_")
+
+
+def rule_label(name):
+    return f"rule:{name}"
+
+
+class AnalysisEngine:
+    """
+    Single-pass rule dispatcher.
+
+    Rules and metric collectors register the AST node types they care
+    about. The engine parses the source once, walks the tree once and
+    calls only the handlers bound to each node's exact type.
+    """
+
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._finalizers = []
+        self._profiler = None
+        self._rebuild()
+
+    def register(self, node_types, handler, labels=None):
+        """
+        Dispatch `node_types` to handler. `labels` names what its time
+        is charged to when profiling (split evenly when it serves several
+        rules); by default the handler's own name.
+        """
+
+        if isinstance(node_types, type):
+            node_types = (node_types,)
+
+        labels = labels or (handler_label(handler),)
+
+        for node_type in node_types:
+            self._handlers[node_type].append((handler, labels))
+
+        self._rebuild()
+
+    def register_finalizer(self, handler, labels=None):
+        self._finalizers.append((handler, labels or (handler_label(handler),)))
+        self._rebuild()
+
+    def set_profiler(self, profiler):
+        """
+        Time every handler call per rule; None restores plain dispatch
+        """
+
+        self._profiler = profiler
+        self._rebuild()
+
+    def _timed(self, handler, labels):
+        add = self._profiler.add
+        clock = time.perf_counter
+        share = 1 / len(labels)
+
+        def timed(*args):
+            start = clock()
+            handler(*args)
+            elapsed = (clock() - start) * share
+            for label in labels:
+                add(label, elapsed)
+
+        return timed
+
+    def _rebuild(self):
+        if self._profiler is None:
+            self._dispatch = {
+                node_type: [handler for handler, _ in handlers]
+                for node_type, handlers in self._handlers.items()
+            }
+            self._finish = [finalizer for finalizer, _ in self._finalizers]
+            return
+
+        self._dispatch = {
+            node_type: [self._timed(handler, labels) for handler, labels in handlers]
+            for node_type, handlers in self._handlers.items()
+        }
+        self._finish = [self._timed(finalizer, labels) for finalizer, labels in self._finalizers]
+
+    def walk(self, root, context):
+        dispatch = self._dispatch
+
+        for node in ast.walk(root):
+            for handler in dispatch.get(type(node), ()):
+                handler(node, context)
+
+    def finish(self, context):
+        for finalizer in self._finish:
+            finalizer(context)
+
+    def run(self, tree):
+        context = AnalysisContext()
+        self.walk(tree, context)
+        self.finish(context)
+        return context
+
+    def analyze(self, code):
+        return self.run(ast.parse(code))
@@ -0,0 +1,124 @@
+import os
+import re
+from functools import lru_cache
+
+
+DEFAULT_INCLUDE = ("*.py",)
+
+
+def _glob_to_regex(pattern):
+    """
+    Translate a path glob: '**' spans directories, '*' and '?' stay
+    within one path component
+    """
+
+    regex = []
+    i = 0
+
+    while i < len(pattern):
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+
+    return "".join(regex)
+
+
+def normalize_path(path):
+    path = os.path.normpath(path).replace(os.sep, "/")
+    return "" if path == "." else path
+
+
+class PathMatcher:
+    """
+    All exclude and include globs compiled into one regex each.
+
+    An exclude pattern matches whole path components at any depth and
+    everything beneath them, so 'tests/' excludes 'tests/a.py' and
+    'pkg/tests/a.py' but not 'contests/a.py'. Include patterns match the
+    file name, or the path when they contain a '/'. Paths are expected
+    normalised with '/' separators (see normalize_path).
+    """
+
+    def __init__(self, exclude_paths=(), include=DEFAULT_INCLUDE):
+        excludes = [_glob_to_regex(p.strip("/")) for p in exclude_paths if p.strip("/")]
+        self._exclude = re.compile(
+            "(?:.*/)?(?:" + "|".join(excludes) + ")(?:/.*)?"
+        ) if excludes else None
+
+        includes = [
+            _glob_to_regex(p) if "/" in p else "(?:.*/)?" + _glob_to_regex(p)
+            for p in include
+        ]
+        self._include = re.compile("|".join(includes)) if includes else None
+
+    def is_excluded(self, path):
+        return self._exclude is not None and self._exclude.fullmatch(path) is not None
+
+    def is_included(self, path):
+        return self._include is None or self._include.fullmatch(path) is not None
+
+
+@lru_cache(maxsize=32)
+def compile_matcher(exclude_paths=(), include=DEFAULT_INCLUDE):
+    return PathMatcher(tuple(exclude_paths), tuple(include))
+
+
+def matcher_from_config(config):
+    return compile_matcher(
+        tuple(config.get("exclude_paths", ())),
+        tuple(config.get("include_paths", DEFAULT_INCLUDE))
+    )
+
+
+def _walk_directory(root, matcher):
+    # Patterns are matched against paths relative to the working
+    # directory, built incrementally instead of per-entry relpath calls
+    stack = [(root, normalize_path(os.path.relpath(root)))]
+
+    while stack:
+        directory, relative = stack.pop()
+        prefix = f"{relative}/" if relative else ""
+
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirectories = []
+
+        for entry in entries:
+            entry_relative = prefix + entry.name
+
+            if matcher.is_excluded(entry_relative):
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append((entry.path, entry_relative))
+            elif entry.is_file() and matcher.is_included(entry_relative):
+                yield entry.path
+
+        # Reversed so directories pop off the stack in name order
+        stack.extend(reversed(subdirectories))
+
+
+def iter_python_files(paths, matcher):
+    """
+    Expand the given paths into files. Explicit files are passed through
+    untouched; directories are walked with excluded subtrees pruned.
+    """
+
+    for path in paths:
+        if os.path.isdir(path):
+            yield from _walk_directory(path, matcher)
+        else:
+            yield path
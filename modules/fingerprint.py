@@ -0,0 +1,180 @@
+import ast
+import hashlib
+import threading
+
+from modules.cache import cache_key, get_cache
+
+
+# Structure below this depth is folded into a placeholder, so large
+# offending nodes (whole functions, loop bodies) still match on shape
+MAX_DEPTH = 4
+
+_IDENTIFIER_FIELDS = ("id", "arg", "name", "attr", "asname", "module")
+
+
+def _canonical(node, depth=0):
+    """
+    Nested tuple form of `node` with identifiers and literal values
+    replaced by placeholders and positions dropped
+    """
+
+    if isinstance(node, list):
+        return tuple(_canonical(item, depth) for item in node)
+
+    if not isinstance(node, ast.AST):
+        return node
+
+    if depth >= MAX_DEPTH:
+        return (type(node).__name__, "...")
+
+    if isinstance(node, ast.Constant):
+        return ("Constant", type(node.value).__name__)
+
+    fields = []
+    for field, value in ast.iter_fields(node):
+        if field in _IDENTIFIER_FIELDS and isinstance(value, str):
+            value = "_"
+        elif field == "names" and isinstance(node, (ast.Global, ast.Nonlocal)):
+            value = len(value)
+        elif field == "ctx":
+            continue
+        else:
+            value = _canonical(value, depth + 1)
+        fields.append((field, value))
+
+    return (type(node).__name__, tuple(fields))
+
+
+def node_fingerprint(rule, node):
+    canonical = repr(_canonical(node))
+    return hashlib.sha256(f"{rule}\0{canonical}".encode("utf-8")).hexdigest()
+
+
+def issue_fingerprints(records):
+    """
+    Fingerprints of the first located occurrence of each rule, computed
+    during analysis (see module1). Returns {rule: fingerprint}.
+    """
+
+    fingerprints = {}
+    for record in records:
+        if record.line is not None and record.rule not in fingerprints:
+            fingerprints[record.rule] = record.fingerprint
+
+    return {rule: fingerprint for rule, fingerprint in fingerprints.items() if fingerprint}
+
+
+class FeedbackStore:
+    """
+    Generated feedback keyed by issue fingerprint, so structurally
+    identical occurrences anywhere in the codebase share one LLM answer.
+
+    Entries live in the shared result cache and are evicted with it (least
+    recently used first, see ResultCache.prune). Lookups and hits are
+    counted for the reuse metric.
+
+    A fingerprint whose answer is being generated is claimed, so other
+    files in flight wait for that answer rather than asking again.
+    """
+
+    def __init__(self, cache, config):
+        self._cache = cache
+        self._config = config
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.lookups = 0
+        self.hits = 0
+
+    def _key(self, fingerprint):
+        return cache_key("feedback", fingerprint, self._config, model=self._config["model"])
+
+    def get(self, fingerprint):
+        result = self._cache.get(self._key(fingerprint))
+
+        with self._lock:
+            self.lookups += 1
+            self.hits += result is not None
+
+        return result
+
+    def set(self, fingerprint, result):
+        self._cache.set(self._key(fingerprint), result)
+
+    def claim(self, fingerprint):
+        """
+        None when the caller now owns generating this fingerprint's answer
+        and must release() it; otherwise an Event set once the current
+        owner is done
+        """
+
+        with self._lock:
+            pending = self._pending.get(fingerprint)
+            if pending is None:
+                self._pending[fingerprint] = threading.Event()
+            return pending
+
+    def release(self, fingerprint, result=None):
+        """
+        Store the owner's answer, if any, and wake the waiters
+        """
+
+        if result is not None:
+            self.set(fingerprint, result)
+
+        with self._lock:
+            pending = self._pending.pop(fingerprint, None)
+
+        if pending is not None:
+            pending.set()
+
+    def wait(self, fingerprint, pending):
+        """
+        Block until a claimed fingerprint is released; returns its answer,
+        or None when the owner produced none
+        """
+
+        pending.wait()
+        result = self._cache.get(self._key(fingerprint))
+
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+
+        return result
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+_STORES = {}
+
+
+def get_feedback_store(config):
+    """
+    Return the feedback store for this process's result cache
+    """
+
+    cache = get_cache(config)
+    key = (id(cache), config["model"])
+
+    if key not in _STORES:
+        _STORES[key] = FeedbackStore(cache, config)
+
+    return _STORES[key]
+
+
+def drain_reuse_stats():
+    """
+    (lookups, hits) over every store since the last call, so a
+    long-running process reports each run on its own
+    """
+
+    lookups = hits = 0
+
+    for store in _STORES.values():
+        with store._lock:
+            lookups += store.lookups
+            hits += store.hits
+            store.lookups = store.hits = 0
+
+    return lookups, hits
@@ -0,0 +1,91 @@
+import re
+
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitError(Exception):
+    """
+    Raised when git diff cannot run; str() is git's own message
+    """
+
+
+def _git_diff(args, base=None):
+    """
+    Run git diff against the index (default) or against the merge base
+    of `base` and HEAD. Raises GitError with git's stderr on failure.
+    """
+
+    import subprocess
+
+    command = ["git", "diff", "--relative", "--no-color", "--no-ext-diff"]
+    command += ["--cached"] if base is None else [f"{base}...HEAD"]
+    command += args
+
+    def run(command):
+        try:
+            return subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace"
+            )
+        except FileNotFoundError:
+            raise GitError("git is not installed") from None
+
+    completed = run(command)
+
+    if completed.returncode != 0:
+        # Outside a repository git diff falls back to --no-index and only
+        # prints its usage, so ask git why first
+        outside = run(["git", "rev-parse", "--git-dir"])
+        failed = outside if outside.returncode != 0 else completed
+        raise GitError(failed.stderr.strip() or f"git diff exited with {completed.returncode}")
+
+    return completed.stdout
+
+
+def changed_hunks(base=None, paths=()):
+    """
+    Return {path: [(start, end), ...]} with the new-side line ranges that
+    were added or modified in each changed Python file. Pure deletions are
+    recorded as a one-line range at the deletion point.
+    """
+
+    diff = _git_diff(["-U0", "--diff-filter=ACMR", "--", *(paths or ["*.py"])], base)
+
+    hunks = {}
+    current = None
+
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            target = line[4:]
+            current = None if target == "/dev/null" else target[2:] if target.startswith("b/") else target
+            if current is not None:
+                hunks.setdefault(current, [])
+            continue
+
+        match = HUNK_HEADER.match(line)
+        if match and current is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            start = max(start, 1)
+            hunks[current].append((start, start + max(count, 1) - 1))
+
+    return hunks
+
+
+def overlaps(span, ranges):
+    return any(span[0] <= end and start <= span[1] for start, end in ranges)
+
+
+def filter_to_hunks(records, ranges):
+    """
+    Keep only the issue records whose spans touch a changed range
+    """
+
+    return [
+        record for record in records
+        if record.line is not None and overlaps((record.line, record.end_line), ranges)
+    ]
@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+
+# Run-wide wall-clock deadline (time.monotonic() value), or None
+_DEADLINE = None
+
+# Set when the run stops early; jobs submitted afterwards are cancelled
+_STOPPED = False
+
+_SCHEDULERS = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+# -----------------------------------
+# RUN DEADLINE
+# -----------------------------------
+
+def set_deadline(seconds):
+    """
+    Start the run's LLM budget: `seconds` from now, or none when falsy.
+    Also clears a previous run's stop_run().
+    """
+
+    global _DEADLINE, _STOPPED
+    _DEADLINE = time.monotonic() + seconds if seconds and seconds > 0 else None
+    _STOPPED = False
+
+
+def remaining():
+    """
+    Seconds left before the deadline, None without one
+    """
+
+    if _DEADLINE is None:
+        return None
+    return max(_DEADLINE - time.monotonic(), 0.0)
+
+
+def expired():
+    return _DEADLINE is not None and time.monotonic() >= _DEADLINE
+
+
+def stop_run():
+    """
+    Abandon the run's remaining LLM work (fail-fast): queued jobs of
+    every scheduler are cancelled, as is anything submitted until the
+    next set_deadline(). Requests already being sent still finish.
+    """
+
+    global _STOPPED
+    _STOPPED = True
+
+    with _SCHEDULERS_LOCK:
+        schedulers = list(_SCHEDULERS.values())
+
+    for scheduler in schedulers:
+        scheduler.cancel_pending()
+
+
+# -----------------------------------
+# PRIORITY SCHEDULER
+# -----------------------------------
+
+class LLMScheduler:
+    """
+    Priority queue of LLM jobs served by a fixed set of worker threads.
+
+    Lower priority values run first, then submission order, so across
+    every file in flight ERROR issues reach the model before WARNING and
+    INFO ones. Once the run deadline has passed, queued jobs are not sent
+    but answered with their fallback.
+    """
+
+    def __init__(self, workers):
+        self.workers = max(workers, 1)
+        self._queue = []
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+        self._threads = []
+
+    def submit(self, priority, call, fallback):
+        """
+        Queue call() at `priority`; fallback() answers instead when the
+        deadline is reached first. Returns a Future.
+        """
+
+        future = Future()
+
+        if _STOPPED:
+            future.cancel()
+            return future
+
+        with self._ready:
+            heapq.heappush(self._queue, (priority, next(self._order), future, call, fallback))
+            self._start_workers()
+            self._ready.notify()
+
+        return future
+
+    def cancel_pending(self):
+        """
+        Cancel every queued job; their futures raise CancelledError
+        """
+
+        with self._ready:
+            queued, self._queue = self._queue, []
+
+        for _, _, future, _, _ in queued:
+            future.cancel()
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                _, _, future, call, fallback = heapq.heappop(self._queue)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(fallback() if expired() else call())
+            except BaseException as error:
+                future.set_exception(error)
+
+
+def get_scheduler(workers):
+    """
+    Return the process-wide scheduler with `workers` threads
+    """
+
+    with _SCHEDULERS_LOCK:
+        if workers not in _SCHEDULERS:
+            _SCHEDULERS[workers] = LLMScheduler(workers)
+        return _SCHEDULERS[workers]
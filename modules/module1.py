@@ -1,111 +1,439 @@
 import ast
+import hashlib
+from dataclasses import replace
+
+from modules.engine import (
+    AnalysisContext, AnalysisEngine, Issue, node_span, remember_span, rule_label
+)
+from modules.fingerprint import node_fingerprint
+from modules.profiler import PROFILER
+from modules.rules import RULE_REGISTRY, Rule, register_rule, select_rules
+
+
+STRUCTURE_METRICS = ("functions", "classes", "loops", "conditionals")
+
 
 def read_python_file(py_file):
     with open(py_file, "r", encoding="utf-8") as f:
         return f.read()
 
-def detect_issues_ast(code):
-    issues = []
-    tree = ast.parse(code)
-
-    # For unused variable detection
-    assigned_vars = set()
-    used_vars = set()
-
-    # Track imports
-    imported_names = set()
-    used_imports = set()
-
-    for node in ast.walk(tree):
-
-        # ===============================
-        # UNUSED VARIABLE
-        # ===============================
-        if isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name):
-                    assigned_vars.add(target.id)
-
-        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
-            used_vars.add(node.id)
-
-        # ===============================
-        # UNUSED IMPORT
-        # ===============================
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imported_names.add(alias.name.split('.')[0])
-
-        if isinstance(node, ast.ImportFrom):
-            for alias in node.names:
-                imported_names.add(alias.name)
-
-        # ===============================
-        # TOO MANY ARGUMENTS
-        # ===============================
-        if isinstance(node, ast.FunctionDef):
-            if len(node.args.args) > 5:
-                issues.append("too_many_arguments")
-
-        # ===============================
-        # LONG FUNCTION
-        # ===============================
-        if isinstance(node, ast.FunctionDef):
-            if len(node.body) > 20:
-                issues.append("long_function")
-
-        # ===============================
-        # BARE EXCEPT
-        # ===============================
-        if isinstance(node, ast.ExceptHandler):
-            if node.type is None:
-                issues.append("bare_except")
-
-        # ===============================
-        # USE OF EVAL OR EXEC
-        # ===============================
-        if isinstance(node, ast.Call):
-            if isinstance(node.func, ast.Name):
-                if node.func.id == "eval":
-                    issues.append("use_of_eval")
-                if node.func.id == "exec":
-                    issues.append("use_of_exec")
-
-        # ===============================
-        # HARDCODED PASSWORD
-        # ===============================
-        if isinstance(node, ast.Assign):
-            for target in node.targets:
-                if isinstance(target, ast.Name):
-                    if "password" in target.id.lower():
-                        if isinstance(node.value, ast.Constant):
-                            issues.append("hardcoded_password")
-
-        # ===============================
-        # MAGIC NUMBER
-        # ===============================
-        if isinstance(node, ast.Constant):
-            if isinstance(node.value, int):
-                if node.value not in (0, 1):
-                    issues.append("magic_number")
-
-        # ===============================
-        # NESTED LOOP
-        # ===============================
-        if isinstance(node, ast.For):
-            for child in node.body:
-                if isinstance(child, ast.For):
-                    issues.append("nested_loop")
-
-    # Detect unused variables
-    unused_vars = assigned_vars - used_vars
-    if unused_vars:
-        issues.append("unused_variable")
-
-    # Detect unused imports
-    unused_imports = imported_names - used_vars
-    if unused_imports:
-        issues.append("unused_import")
-
-    # Remove duplicates
-    return list(set(issues))
+
+# ===============================
+# UNUSED VARIABLE / UNUSED IMPORT
+# ===============================
+
+def _track_assign(node, context):
+    assigned_vars = context.state.setdefault("assigned_vars", {})
+    for target in node.targets:
+        if isinstance(target, ast.Name):
+            remember_span(assigned_vars, target.id, node_span(node))
+
+
+def _track_name(node, context):
+    if isinstance(node.ctx, ast.Load):
+        context.state.setdefault("used_vars", set()).add(node.id)
+
+
+def _track_import(node, context):
+    imported_names = context.state.setdefault("imported_names", {})
+    for alias in node.names:
+        remember_span(imported_names, alias.name.split('.')[0], node_span(node))
+
+
+def _track_import_from(node, context):
+    imported_names = context.state.setdefault("imported_names", {})
+    for alias in node.names:
+        remember_span(imported_names, alias.name, node_span(node))
+
+
+def _report_unused(context, issue, defined):
+    used_vars = context.state.get("used_vars", set())
+    unused = sorted((span, name) for name, span in defined.items() if name not in used_vars)
+    for span, name in unused:
+        context.report(issue, span=span, symbol=name)
+
+
+def _check_unused_variables(context):
+    _report_unused(context, "unused_variable", context.state.get("assigned_vars", {}))
+
+
+def _check_unused_imports(context):
+    _report_unused(context, "unused_import", context.state.get("imported_names", {}))
+
+
+# ===============================
+# FUNCTION SHAPE
+# ===============================
+
+def _check_too_many_arguments(node, context):
+    if len(node.args.args) > 5:
+        context.report("too_many_arguments", node, symbol=node.name)
+
+
+def _check_long_function(node, context):
+    if len(node.body) > 20:
+        context.report("long_function", node, symbol=node.name)
+
+
+# ===============================
+# BARE EXCEPT
+# ===============================
+
+def _check_except(node, context):
+    if node.type is None:
+        context.report("bare_except", node)
+
+
+# ===============================
+# USE OF EVAL OR EXEC
+# ===============================
+
+def _check_eval(node, context):
+    if isinstance(node.func, ast.Name) and node.func.id == "eval":
+        context.report("use_of_eval", node, symbol="eval")
+
+
+def _check_exec(node, context):
+    if isinstance(node.func, ast.Name) and node.func.id == "exec":
+        context.report("use_of_exec", node, symbol="exec")
+
+
+# ===============================
+# HARDCODED PASSWORD
+# ===============================
+
+def _check_password(node, context):
+    for target in node.targets:
+        if isinstance(target, ast.Name):
+            if "password" in target.id.lower():
+                if isinstance(node.value, ast.Constant):
+                    context.report("hardcoded_password", node, symbol=target.id)
+
+
+# ===============================
+# MAGIC NUMBER
+# ===============================
+
+def _check_constant(node, context):
+    if isinstance(node.value, int):
+        if node.value not in (0, 1):
+            context.report("magic_number", node, symbol=repr(node.value))
+
+
+# ===============================
+# NESTED LOOP
+# ===============================
+
+def _check_for(node, context):
+    for child in node.body:
+        if isinstance(child, ast.For):
+            context.report("nested_loop", child)
+
+
+# ===============================
+# BUILT-IN RULES
+# ===============================
+
+register_rule(Rule(
+    "unused_variable",
+    [(ast.Assign, _track_assign), (ast.Name, _track_name)],
+    finalizer=_check_unused_variables,
+    severity="WARNING"
+))
+register_rule(Rule(
+    "unused_import",
+    [(ast.Import, _track_import), (ast.ImportFrom, _track_import_from), (ast.Name, _track_name)],
+    finalizer=_check_unused_imports
+))
+register_rule(Rule("too_many_arguments", [(ast.FunctionDef, _check_too_many_arguments)]))
+register_rule(Rule("long_function", [(ast.FunctionDef, _check_long_function)]))
+register_rule(Rule("bare_except", [(ast.ExceptHandler, _check_except)], severity="WARNING"))
+register_rule(Rule("use_of_eval", [(ast.Call, _check_eval)]))
+register_rule(Rule("use_of_exec", [(ast.Call, _check_exec)]))
+register_rule(Rule("hardcoded_password", [(ast.Assign, _check_password)]))
+register_rule(Rule("magic_number", [(ast.Constant, _check_constant)]))
+register_rule(Rule("nested_loop", [(ast.For, _check_for)]))
+
+
+# ===============================
+# STRUCTURE METRICS
+# ===============================
+
+def _metric_collector(metric):
+    def collect(node, context):
+        context.count(metric)
+
+    collect.__name__ = f"metric_{metric}"
+    return collect
+
+
+METRIC_COLLECTORS = [
+    (ast.FunctionDef, _metric_collector("functions")),
+    (ast.ClassDef, _metric_collector("classes")),
+    ((ast.For, ast.While), _metric_collector("loops")),
+    (ast.If, _metric_collector("conditionals"))
+]
+
+
+def build_engine(rules):
+    """
+    Bind only the given rules (plus the structure metric collectors)
+    into a dispatch table; disabled rules cost nothing per node
+    """
+
+    engine = AnalysisEngine()
+
+    # A handler shared between rules is bound once and its time split
+    # between the rules it serves, so profiles are per rule id
+    served = {}
+
+    for rule in rules:
+        for node_types, handler in rule.handlers:
+            served.setdefault((node_types, handler), []).append(rule_label(rule.name))
+
+        if rule.finalizer is not None:
+            engine.register_finalizer(rule.finalizer, (rule_label(rule.name),))
+
+    for (node_types, handler), labels in served.items():
+        engine.register(node_types, handler, tuple(labels))
+
+    for node_types, collector in METRIC_COLLECTORS:
+        engine.register(node_types, collector, ("metrics",))
+
+    return engine
+
+
+_ENGINES = {}
+
+
+def get_engine(rule_names=None):
+    """
+    Return the shared engine for a set of enabled rule names
+    (None or empty means every registered rule)
+    """
+
+    key = tuple(rule_names or ())
+
+    if key not in _ENGINES:
+        rules, _ = select_rules(key)
+        engine = build_engine(rules)
+        engine.set_profiler(PROFILER if PROFILER.enabled else None)
+        _ENGINES[key] = engine
+
+    return _ENGINES[key]
+
+
+def build_default_engine():
+    return build_engine(RULE_REGISTRY.values())
+
+
+DEFAULT_ENGINE = build_default_engine()
+
+
+def set_profiling(enabled):
+    """
+    Switch the shared profiler on or off, including per-rule timing
+    """
+
+    PROFILER.enabled = enabled
+    for engine in [DEFAULT_ENGINE, *_ENGINES.values()]:
+        engine.set_profiler(PROFILER if enabled else None)
+
+
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _first_line(node):
+    # Decorators belong to their function or class
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", ())])
+
+
+def _reported_on(node, record):
+    end_line = getattr(node, "end_lineno", None) or node.lineno
+
+    if record.col is not None:
+        return (node.lineno, node.col_offset, end_line, node.end_col_offset) == (
+            record.line, record.col, record.end_line, record.end_col
+        )
+
+    # Span-only records point at the statement that defined the name
+    return isinstance(node, ast.stmt) and (node.lineno, end_line) == (record.line, record.end_line)
+
+
+def _locate(tree, record):
+    """
+    Find the node a record was reported on, outermost first, and the span
+    of the innermost function or class around it. Only nodes whose lines
+    cover the record are descended into.
+    """
+
+    stack = [(tree, None)]
+    innermost = None
+
+    while stack:
+        node, scope = stack.pop()
+
+        if hasattr(node, "lineno"):
+            start, end = _first_line(node), getattr(node, "end_lineno", None) or node.lineno
+            if start > record.line or end < record.end_line:
+                continue
+            if isinstance(node, SCOPE_NODES):
+                scope = innermost = (start, end)
+            if _reported_on(node, record):
+                return node, scope
+
+        stack.extend((child, scope) for child in reversed(list(ast.iter_child_nodes(node))))
+
+    return None, innermost
+
+
+def _anchor(records, tree):
+    """
+    Give the first located occurrence of each rule its fingerprint and
+    enclosing scope, from the tree that was just walked
+    """
+
+    seen = set()
+
+    for index, record in enumerate(records):
+        if record.line is None or record.rule in seen:
+            continue
+        seen.add(record.rule)
+
+        node, scope = _locate(tree, record)
+        records[index] = replace(
+            record,
+            fingerprint=node_fingerprint(record.rule, node) if node is not None else None,
+            scope=scope
+        )
+
+    return records
+
+
+def _summarize(context, tree):
+    records = sorted(context.records, key=Issue.sort_key)
+    metrics = {metric: context.metrics.get(metric, 0) for metric in STRUCTURE_METRICS}
+
+    with PROFILER.phase("anchor"):
+        _anchor(records, tree)
+
+    return records, metrics
+
+
+def analyze_tree(tree, engine=DEFAULT_ENGINE):
+    """
+    Walk an already parsed tree once and return (records, metrics).
+    records holds one Issue per occurrence, in source order; nothing is
+    deduplicated here, see issue_counts() and issue_spans().
+    """
+
+    with PROFILER.phase("walk"):
+        context = engine.run(tree)
+
+    return _summarize(context, tree)
+
+
+def analyze_code(code, engine=DEFAULT_ENGINE):
+    """
+    Parse the source once and return (records, metrics)
+    """
+
+    with PROFILER.phase("parse"):
+        tree = ast.parse(code)
+
+    return analyze_tree(tree, engine)
+
+
+FRAGMENT_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def analyze_code_incremental(code, load_fragment, save_fragment, engine=DEFAULT_ENGINE):
+    """
+    Like analyze_code, but top-level functions and classes are analysed as
+    separate fragments keyed by a hash of their source. load_fragment(key)
+    returns a previously saved fragment or None; save_fragment(key, fragment)
+    stores a new one. Unchanged functions are therefore not walked again,
+    even if they moved within the file.
+    """
+
+    with PROFILER.phase("parse"):
+        tree = ast.parse(code)
+
+    lines = code.splitlines()
+    context = AnalysisContext()
+
+    for node in tree.body:
+        if not isinstance(node, FRAGMENT_NODES):
+            engine.walk(node, context)
+            continue
+
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        source = "\n".join(lines[start - 1:node.end_lineno])
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+        fragment = load_fragment(key)
+        if fragment is None:
+            fragment_context = AnalysisContext()
+            engine.walk(node, fragment_context)
+            fragment = fragment_context.export(offset=start)
+            save_fragment(key, fragment)
+
+        context.merge(fragment, offset=start)
+
+    engine.finish(context)
+
+    return _summarize(context, tree)
+
+
+# ===============================
+# AGGREGATION
+# ===============================
+
+def issue_counts(records):
+    """
+    Occurrences per rule, in order of first occurrence
+    """
+
+    counts = {}
+    for record in records:
+        counts[record.rule] = counts.get(record.rule, 0) + 1
+    return counts
+
+
+def issue_spans(records):
+    """
+    Map each rule to the (lineno, end_lineno) of its first located occurrence
+    """
+
+    spans = {}
+    for record in records:
+        if record.line is not None:
+            spans.setdefault(record.rule, (record.line, record.end_line))
+    return spans
+
+
+def issue_scopes(records):
+    """
+    Map each rule to the span of the function or class around its first
+    located occurrence, None at module level
+    """
+
+    scopes = {}
+    for record in records:
+        if record.line is not None:
+            scopes.setdefault(record.rule, record.scope)
+    return scopes
+
+
+def detect_issues_ast(code, rule_names=None):
+    """
+    Rule ids found in the code, with the configured rules unless
+    `rule_names` is given
+    """
+
+    if rule_names is None:
+        from modules.config_loader import load_config
+        rule_names = load_config()["rules"]
+
+    records, _ = analyze_code(code, get_engine(rule_names))
+    return list(issue_counts(records))
@@ -1,13 +1,121 @@
 import json
-from backend.ollama_client import OllamaClient
+import threading
+import time
+from functools import partial
+
+from backend.ollama_client import OllamaClient, DEFAULT_MODEL, OLLAMA_HOST
+from modules.llm_scheduler import expired, get_scheduler, remaining
+from modules.profiler import PROFILER
+from modules.rules import rule_severity
+from modules.prompt_context import (
+    DEFAULT_CONTEXT_WINDOW, DEFAULT_MAX_CONTEXT_TOKENS, extract_context, scope_spans
+)
+
+SERVER_DOWN_FEEDBACK = "Ollama server not running."
+ERROR_FEEDBACK_PREFIX = "Ollama error"
+OFFLINE_FEEDBACK = "Not reviewed: the LLM deadline for this run was reached."
+DEFAULT_CONCURRENCY = 4
+
+# LLM jobs are scheduled most severe first
+SEVERITY_PRIORITY = {
+    "ERROR": 0,
+    "WARNING": 1,
+    "INFO": 2
+}
+
+_CLIENTS = {}
+
+# Issues answered offline since the last drain_offline_count()
+_OFFLINE = {"count": 0}
+_OFFLINE_LOCK = threading.Lock()
+
+
+def get_client(model=DEFAULT_MODEL, host=OLLAMA_HOST, timeout=60, retries=2,
+               backoff=0.5, health_ttl=30, pool_size=DEFAULT_CONCURRENCY, keep_alive=None):
+    """
+    Return a shared OllamaClient so its pooled session and memoized
+    health check survive across files
+    """
+
+    key = (model, host, timeout, retries, backoff, health_ttl, pool_size, keep_alive)
+
+    if key not in _CLIENTS:
+        _CLIENTS[key] = OllamaClient(
+            model,
+            host=host,
+            timeout=timeout,
+            retries=retries,
+            backoff=backoff,
+            health_ttl=health_ttl,
+            pool_size=pool_size,
+            keep_alive=keep_alive
+        )
+
+    return _CLIENTS[key]
+
+
+def client_from_config(config):
+    return get_client(
+        config.get("model", DEFAULT_MODEL),
+        host=config.get("ollama_host", OLLAMA_HOST),
+        timeout=config.get("ollama_timeout", 60),
+        retries=config.get("ollama_retries", 2),
+        backoff=config.get("ollama_backoff", 0.5),
+        health_ttl=config.get("ollama_health_ttl", 30),
+        pool_size=max(config.get("ai_concurrency", DEFAULT_CONCURRENCY), 1),
+        keep_alive=config.get("ollama_keep_alive")
+    )
+
+
+def warm_up(config):
+    """
+    Load the model in the background while the run's files are analysed
+    """
+
+    if not config.get("ollama_warm_up"):
+        return
+
+    client = client_from_config(config)
+
+    def load():
+        if client.is_server_running():
+            client.warm_up()
+
+    threading.Thread(target=load, daemon=True).start()
 
 
 def classify_severity(issue):
-    if issue in ["unused_variable", "bare_except"]:
-        return "WARNING"
-    elif issue in ["syntax_error"]:
+    if issue in ["syntax_error"]:
         return "ERROR"
-    return "INFO"
+
+    # Built-in and plugin rules declare their own severity
+    return rule_severity(issue)
+
+def issue_priority(issue):
+    return SEVERITY_PRIORITY.get(classify_severity(issue), len(SEVERITY_PRIORITY))
+
+
+def offline_result(issue):
+    """
+    Stand-in result for an issue the deadline left unreviewed
+    """
+
+    with _OFFLINE_LOCK:
+        _OFFLINE["count"] += 1
+
+    return {
+        "issue": issue,
+        "severity": classify_severity(issue),
+        "feedback": OFFLINE_FEEDBACK,
+        "offline": True
+    }
+
+
+def drain_offline_count():
+    with _OFFLINE_LOCK:
+        count, _OFFLINE["count"] = _OFFLINE["count"], 0
+    return count
+
 
 def build_results(issues):
     """
@@ -25,59 +133,373 @@ def build_results(issues):
         results.append(result)
 
     return results
-def build_results_with_ai(issues, code):
 
-    client = OllamaClient()
-    results = []
 
-    if not client.is_server_running():
-        return [{
-            "issue": issue,
-            "severity": classify_severity(issue),
-            "ai_feedback": "Ollama server not running."
-        } for issue in issues]
+def is_cacheable(results):
+    """
+    AI results are only worth caching if every issue got real feedback
+    """
 
-    for issue in issues:
+    for result in results:
+        if result.get("offline"):
+            return False
+        feedback = str(result.get("feedback", result.get("ai_feedback", "")))
+        if feedback == SERVER_DOWN_FEEDBACK or feedback.startswith(ERROR_FEEDBACK_PREFIX):
+            return False
+    return True
+
+
+def build_contexts(issues, code, spans=None, window=DEFAULT_CONTEXT_WINDOW,
+                   max_tokens=DEFAULT_MAX_CONTEXT_TOKENS, scopes=None):
+    """
+    Cut a prompt-sized excerpt of the code around each issue.
+    Returns {issue: (start, end, snippet)}.
+
+    `scopes` maps issues to the span of their enclosing function or
+    class, as found during analysis (see issue_scopes); without it the
+    code is parsed again to find them.
+    """
+
+    spans = spans or {}
+
+    if scopes is None:
+        every_scope = scope_spans(code) if spans else []
+        return {
+            issue: extract_context(code, spans.get(issue), every_scope, window, max_tokens)
+            for issue in issues
+        }
 
-        prompt = f"""
+    return {
+        issue: extract_context(
+            code, spans.get(issue), [scopes[issue]] if scopes.get(issue) else [],
+            window, max_tokens
+        )
+        for issue in issues
+    }
+
+
+def build_issue_prompt(issue, context):
+    start, end, snippet = context
+
+    return f"""
 You are a professional Python code reviewer.
 
 Analyze the following issue in the code.
 
 Issue: {issue}
 
-Code:
-{code}
+Code (lines {start}-{end}):
+{snippet}
 
 Respond ONLY in this JSON format:
 
 {{
   "issue": "{issue}",
-  "severity": "INFO | WARNING | ERROR",
   "feedback": "clear explanation and fix suggestion"
 }}
 
 Do NOT include anything else.
 """
 
-        response = client.generate(prompt)
 
-        # Try parsing AI JSON safely
+def build_stream_prompt(issue, context):
+    start, end, snippet = context
+
+    return f"""
+You are a professional Python code reviewer.
+
+Analyze the following issue in the code.
+
+Issue: {issue}
+
+Code (lines {start}-{end}):
+{snippet}
+
+Respond with a short, clear explanation of the problem and how to fix it.
+Use plain text, not JSON.
+"""
+
+
+def build_batch_prompt(issues, contexts):
+    sections = []
+    for issue in issues:
+        start, end, snippet = contexts[issue]
+        sections.append(f"Issue: {issue}\nCode (lines {start}-{end}):\n{snippet}")
+    sections = "\n\n".join(sections)
+
+    return f"""
+You are a professional Python code reviewer.
+
+Analyze each of the following issues in the code.
+
+{sections}
+
+Respond ONLY with a JSON array containing one object per issue, in this format:
+
+[
+  {{
+    "issue": "<issue name from the list>",
+    "feedback": "clear explanation and fix suggestion"
+  }}
+]
+
+Do NOT include anything else.
+"""
+
+
+def parse_ai_response(issue, response):
+    # Try parsing AI JSON safely
+    try:
+        ai_data = json.loads(response)
+
+        # The issue id is the one asked about, whatever the model calls it,
+        # and severity is the rule's; only the feedback text is the model's
+        return {
+            "issue": issue,
+            "severity": classify_severity(issue),
+            "feedback": ai_data.get("feedback", "No feedback provided.")
+        }
+
+    except Exception:
+        # If AI doesn't return valid JSON
+        return {
+            "issue": issue,
+            "severity": classify_severity(issue),
+            "feedback": response
+        }
+
+
+def parse_batch_response(issues, response):
+    """
+    Map a JSON array answer back onto the requested issues.
+    Returns {issue: result} for every issue the model answered.
+    """
+
+    try:
+        items = json.loads(response)
+    except Exception:
+        return {}
+
+    if not isinstance(items, list):
+        return {}
+
+    answered = {}
+
+    for item in items:
+        if not isinstance(item, dict) or item.get("issue") not in issues:
+            continue
+
+        issue = item["issue"]
+        answered.setdefault(issue, {
+            "issue": issue,
+            "severity": classify_severity(issue),
+            "feedback": item.get("feedback", "No feedback provided.")
+        })
+
+    return answered
+
+
+def _generate(client, prompt):
+    # Requests never outlive the run deadline
+    if not PROFILER.enabled:
+        return client.generate(prompt, timeout=remaining())
+
+    start = time.perf_counter()
+    response = client.generate(prompt, timeout=remaining())
+    PROFILER.record_llm(time.perf_counter() - start, prompt, response)
+
+    return response
+
+
+def _generate_stream(client, prompt):
+    if not PROFILER.enabled:
+        yield from client.generate_stream(prompt, timeout=remaining())
+        return
+
+    start = time.perf_counter()
+    first_token = None
+    chunks = []
+
+    for text in client.generate_stream(prompt, timeout=remaining()):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        chunks.append(text)
+        yield text
+
+    PROFILER.record_llm(time.perf_counter() - start, prompt, "".join(chunks), first_token)
+
+
+def _generate_each(client, issues, contexts, concurrency):
+    """
+    One request per issue through the shared scheduler, so requests from
+    every file in flight are served most severe first by `concurrency`
+    workers; issues still queued at the deadline are answered offline
+    """
+
+    def review_issue(issue):
+        response = _generate(client, build_issue_prompt(issue, contexts[issue]))
+        if response.startswith(ERROR_FEEDBACK_PREFIX) and expired():
+            return offline_result(issue)
+        return parse_ai_response(issue, response)
+
+    scheduler = get_scheduler(max(concurrency, 1))
+    futures = [
+        scheduler.submit(
+            issue_priority(issue),
+            partial(review_issue, issue),
+            partial(offline_result, issue)
+        )
+        for issue in issues
+    ]
+
+    return [future.result() for future in futures]
+
+
+def _generate_batch(client, issues, contexts, concurrency):
+    """
+    One combined request through the shared scheduler, at the priority
+    of its most severe issue. Returns {issue: result} for the issues the
+    model answered; every issue is answered offline at the deadline.
+    """
+
+    def offline_batch():
+        return {issue: offline_result(issue) for issue in issues}
+
+    def review_batch():
+        response = _generate(client, build_batch_prompt(issues, contexts))
+        if response.startswith(ERROR_FEEDBACK_PREFIX) and expired():
+            return offline_batch()
+        return parse_batch_response(issues, response)
+
+    if not issues:
+        return {}
+
+    scheduler = get_scheduler(max(concurrency, 1))
+    priority = min(issue_priority(issue) for issue in issues)
+
+    return scheduler.submit(priority, review_batch, offline_batch).result()
+
+
+def build_results_with_ai(issues, code, model=DEFAULT_MODEL,
+                          concurrency=DEFAULT_CONCURRENCY, batch=False, client=None,
+                          spans=None, context_window=DEFAULT_CONTEXT_WINDOW,
+                          max_context_tokens=DEFAULT_MAX_CONTEXT_TOKENS, scopes=None):
+    """
+    Generate AI feedback for every issue.
+
+    Requests go through the shared LLM scheduler, served by `concurrency`
+    workers most severe first. With batch=True all issues go out in a
+    single prompt and only the ones missing from the answer are retried
+    individually.
+
+    `spans` maps issues to (lineno, end_lineno); prompts then carry only
+    the enclosing function or class plus `context_window` lines around it,
+    capped at `max_context_tokens`. `scopes` gives those enclosing spans
+    when analysis already found them (see build_contexts).
+    """
+
+    if client is None:
+        client = get_client(model, pool_size=max(concurrency, 1))
+
+    if expired():
+        return [offline_result(issue) for issue in issues]
+
+    if not client.is_server_running():
+        return [{
+            "issue": issue,
+            "severity": classify_severity(issue),
+            "ai_feedback": SERVER_DOWN_FEEDBACK
+        } for issue in issues]
+
+    contexts = build_contexts(issues, code, spans, context_window, max_context_tokens, scopes)
+
+    if not batch:
+        return _generate_each(client, issues, contexts, concurrency)
+
+    answered = _generate_batch(client, issues, contexts, concurrency)
+
+    missing = [issue for issue in issues if issue not in answered]
+    retried = _generate_each(client, missing, contexts, concurrency)
+    answered.update(zip(missing, retried))
+
+    return [answered[issue] for issue in issues]
+
+
+def stream_results_with_ai(issues, code, model=DEFAULT_MODEL, client=None, spans=None,
+                           context_window=DEFAULT_CONTEXT_WINDOW,
+                           max_context_tokens=DEFAULT_MAX_CONTEXT_TOKENS, scopes=None):
+    """
+    Generate AI feedback issue by issue, yielding events as text arrives:
+
+        ("start", issue, severity)
+        ("token", issue, text)
+        ("result", issue, result)
+
+    Severity comes from classify_severity since the model answers in
+    plain text. The "result" dicts have the same shape as those of
+    build_results_with_ai.
+    """
+
+    if client is None:
+        client = get_client(model)
+
+    if not client.is_server_running():
+        for issue in issues:
+            severity = classify_severity(issue)
+            yield "start", issue, severity
+            yield "token", issue, SERVER_DOWN_FEEDBACK
+            yield "result", issue, {
+                "issue": issue,
+                "severity": severity,
+                "ai_feedback": SERVER_DOWN_FEEDBACK
+            }
+        return
+
+    contexts = build_contexts(issues, code, spans, context_window, max_context_tokens, scopes)
+
+    for issue in issues:
+        severity = classify_severity(issue)
+        yield "start", issue, severity
+
+        if expired():
+            yield "token", issue, OFFLINE_FEEDBACK
+            yield "result", issue, offline_result(issue)
+            continue
+
+        chunks = []
+        cut_off = False
+        failure = None
+
         try:
-            ai_data = json.loads(response)
+            for text in _generate_stream(client, build_stream_prompt(issue, contexts[issue])):
+                # The read timeout applies per chunk, so a steadily
+                # streaming answer is cut off here instead
+                if expired():
+                    cut_off = True
+                    break
+                chunks.append(text)
+                yield "token", issue, text
+        except Exception as error:
+            # Whatever arrived before the failure is discarded; the error
+            # result is never cached, so the issue is asked again next run
+            failure = f"{ERROR_FEEDBACK_PREFIX}: {error}"
 
-            results.append({
-                "issue": ai_data.get("issue", issue),
-                "severity": ai_data.get("severity", classify_severity(issue)),
-                "feedback": ai_data.get("feedback", "No feedback provided.")
-            })
+        if cut_off or (failure and expired()):
+            yield "token", issue, f"\n{OFFLINE_FEEDBACK}"
+            yield "result", issue, offline_result(issue)
+            continue
 
-        except Exception:
-            # If AI doesn't return valid JSON
-            results.append({
+        if failure:
+            yield "token", issue, f"\n{failure}" if chunks else failure
+            yield "result", issue, {
                 "issue": issue,
-                "severity": classify_severity(issue),
-                "feedback": response
-            })
+                "severity": severity,
+                "feedback": failure
+            }
+            continue
 
-    return results
+        yield "result", issue, {
+            "issue": issue,
+            "severity": severity,
+            "feedback": "".join(chunks).strip()
+        }
@@ -1,17 +1,29 @@
+import os
+from array import array
+
+
+# Quality score penalty per issue occurrence, by severity
+SEVERITY_WEIGHTS = {
+    "INFO": 2,
+    "WARNING": 5,
+    "ERROR": 10
+}
+
+SEVERITIES = tuple(SEVERITY_WEIGHTS)
+
+# Maintainability index penalty per issue occurrence
+MI_PENALTY = 5
+
+
 def calculate_quality_score(results):
     score = 100
     for item in results:
-        if item["severity"] == "INFO":
-            score -= 2
-        elif item["severity"] == "WARNING":
-            score -= 5
-        elif item["severity"] == "CRITICAL":
-            score -= 10
+        score -= SEVERITY_WEIGHTS.get(item["severity"], 0)
     return max(score, 0)
 
 
 def calculate_maintainability_index(results):
-    return max(100 - len(results) * 5, 0)
+    return max(100 - len(results) * MI_PENALTY, 0)
 
 
 def classify_maintainability(mi):
@@ -34,3 +46,157 @@ def aggregate_module3_results(results, filename):
         "maintainability_index": mi,
         "maintainability_level": mi_level
     }
+
+
+# ===============================
+# PROJECT ROLLUP
+# ===============================
+
+class IssueTable:
+    """
+    Columnar table of every issue occurrence across a project.
+
+    Each occurrence is three small integers (file id, rule id, severity
+    id) appended to compact typed arrays, so a repository's worth of
+    issues costs a few bytes each. summarize_project() views the arrays
+    as NumPy columns without copying.
+    """
+
+    def __init__(self):
+        self.files = []
+        self.rules = []
+        self._rule_ids = {}
+        self._file_col = array("i")
+        self._rule_col = array("i")
+        self._severity_col = array("b")
+
+    def __len__(self):
+        return len(self._file_col)
+
+    def add_file(self, file_path, issues=()):
+        """
+        Register a file, including one without issues, with its
+        (rule, severity) pairs
+        """
+
+        file_id = len(self.files)
+        self.files.append(file_path)
+
+        for rule, severity in issues:
+            rule_id = self._rule_ids.get(rule)
+            if rule_id is None:
+                rule_id = self._rule_ids[rule] = len(self.rules)
+                self.rules.append(rule)
+
+            self._file_col.append(file_id)
+            self._rule_col.append(rule_id)
+            self._severity_col.append(
+                SEVERITIES.index(severity) if severity in SEVERITY_WEIGHTS else 0
+            )
+
+    def columns(self):
+        import numpy as np
+
+        return (
+            np.frombuffer(self._file_col, dtype=np.intc),
+            np.frombuffer(self._rule_col, dtype=np.intc),
+            np.frombuffer(self._severity_col, dtype=np.int8)
+        )
+
+
+def _levels(mi):
+    return [classify_maintainability(value) for value in mi.tolist()]
+
+
+def summarize_project(table, top=10):
+    """
+    Per-file, per-directory and per-rule scores plus a project summary,
+    computed with vectorized NumPy reductions over the issue columns.
+    Scores use the same formulas as aggregate_module3_results.
+    """
+
+    import numpy as np
+
+    file_ids, rule_ids, severity_ids = table.columns()
+    file_count = len(table.files)
+    rule_count = len(table.rules)
+
+    weights = np.array([SEVERITY_WEIGHTS[severity] for severity in SEVERITIES])
+
+    # Per file
+    issues_per_file = np.bincount(file_ids, minlength=file_count)
+    penalty_per_file = np.bincount(file_ids, weights=weights[severity_ids], minlength=file_count)
+    quality = np.maximum(100 - penalty_per_file, 0)
+    mi = np.maximum(100 - issues_per_file * MI_PENALTY, 0)
+
+    # Per directory, averaging file scores over every file in it
+    directories, directory_of_file = np.unique(
+        np.array([os.path.dirname(path) or "." for path in table.files], dtype=object),
+        return_inverse=True
+    )
+    files_per_directory = np.bincount(directory_of_file, minlength=len(directories))
+    directory_issues = np.bincount(
+        directory_of_file, weights=issues_per_file, minlength=len(directories)
+    )
+    directory_quality = np.bincount(
+        directory_of_file, weights=quality, minlength=len(directories)
+    ) / np.maximum(files_per_directory, 1)
+    directory_mi = np.bincount(
+        directory_of_file, weights=mi, minlength=len(directories)
+    ) / np.maximum(files_per_directory, 1)
+
+    # Per rule: occurrences, distinct files and severity
+    issues_per_rule = np.bincount(rule_ids, minlength=rule_count)
+    file_rule_pairs = np.unique(file_ids.astype(np.int64) * max(rule_count, 1) + rule_ids)
+    files_per_rule = np.bincount(file_rule_pairs % max(rule_count, 1), minlength=rule_count)
+    rule_severity = np.zeros(rule_count, dtype=np.int8)
+    np.maximum.at(rule_severity, rule_ids, severity_ids)
+
+    severity_counts = np.bincount(severity_ids, minlength=len(SEVERITIES))
+
+    worst_files = np.lexsort((-issues_per_file, quality))[:top]
+    directory_order = np.argsort(directory_quality, kind="stable")
+    rule_order = np.argsort(-issues_per_rule, kind="stable")
+
+    project_mi = float(mi.mean()) if file_count else 100.0
+
+    return {
+        "project": {
+            "files": file_count,
+            "files_with_issues": int(np.count_nonzero(issues_per_file)),
+            "total_issues": len(table),
+            "severities": dict(zip(SEVERITIES, severity_counts.tolist())),
+            "quality_score": float(quality.mean()) if file_count else 100.0,
+            "maintainability_index": project_mi,
+            "maintainability_level": classify_maintainability(project_mi)
+        },
+        "worst_files": [
+            {
+                "file": table.files[index],
+                "total_issues": int(issues_per_file[index]),
+                "quality_score": int(quality[index]),
+                "maintainability_index": int(mi[index]),
+                "maintainability_level": level
+            }
+            for index, level in zip(worst_files.tolist(), _levels(mi[worst_files]))
+        ],
+        "directories": [
+            {
+                "directory": directories[index],
+                "files": int(files_per_directory[index]),
+                "total_issues": int(directory_issues[index]),
+                "quality_score": round(float(directory_quality[index]), 2),
+                "maintainability_index": round(float(directory_mi[index]), 2)
+            }
+            for index in directory_order.tolist()
+        ],
+        "rules": [
+            {
+                "rule": table.rules[index],
+                "severity": SEVERITIES[rule_severity[index]],
+                "occurrences": int(issues_per_rule[index]),
+                "files": int(files_per_rule[index])
+            }
+            for index in rule_order.tolist()
+        ]
+    }
@@ -0,0 +1,61 @@
+from collections import deque
+
+
+_END = object()
+
+
+def pipelined(items, analyze, complete, jobs=1, depth=2, initializer=None):
+    """
+    Two-stage producer/consumer pipeline yielding complete(analyze(item))
+    for every item, in input order.
+
+    analyze is the CPU-bound stage: it runs ahead in a process pool of
+    `jobs` workers (a single background thread when jobs is 1) and must
+    be picklable; `initializer` runs in each pool worker. complete is
+    the I/O-bound stage (LLM calls): up to `depth` items are in it at
+    once, on threads. Both queues are bounded, so analysis runs at most
+    a few files ahead of the LLM and completed results wait only for
+    earlier items to be yielded.
+    """
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    depth = max(depth, 1)
+    ahead = max(jobs * 2, depth)
+    items = iter(items)
+
+    if jobs > 1:
+        analysis_pool = ProcessPoolExecutor(max_workers=jobs, initializer=initializer)
+    else:
+        analysis_pool = ThreadPoolExecutor(max_workers=1)
+
+    with analysis_pool, ThreadPoolExecutor(max_workers=depth) as completion_pool:
+        analyses = deque()
+        completions = deque()
+
+        def refill():
+            while len(analyses) < ahead:
+                item = next(items, _END)
+                if item is _END:
+                    return
+                analyses.append(analysis_pool.submit(analyze, item))
+
+        refill()
+
+        try:
+            while analyses or completions:
+                # Feed the LLM stage while it has room; otherwise hand back
+                # the oldest completion, which is also the next one in
+                # input order
+                if analyses and len(completions) < depth:
+                    analysis = analyses.popleft().result()
+                    refill()
+                    completions.append(completion_pool.submit(complete, analysis))
+                    continue
+
+                yield completions.popleft().result()
+        finally:
+            # Closed early (fail-fast): drop queued work so leaving the
+            # pools only waits for what is already running
+            for future in (*analyses, *completions):
+                future.cancel()
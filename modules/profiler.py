@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Rough characters-per-token ratio used to estimate prompt sizes
+CHARS_PER_TOKEN = 4
+
+_DISABLED = nullcontext()
+
+
+class Profiler:
+    """
+    Wall time and call counts per phase and per rule, per-request LLM
+    latency and prompt size, and per-file totals.
+
+    Disabled by default; phase() then hands back a shared no-op context
+    manager and the engine dispatches to unwrapped handlers, so the cost
+    when off is one attribute check per phase.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phases = {}
+        self.llm_requests = []
+        self.files = {}
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def phase(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    def track_file(self, file_path):
+        if not self.enabled:
+            return _DISABLED
+        return self._timed_file(file_path)
+
+    @contextmanager
+    def _timed_file(self, file_path):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_file(file_path, time.perf_counter() - start)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def record_llm(self, latency, prompt, response="", first_token=None):
+        with self._lock:
+            self.llm_requests.append({
+                "latency_s": latency,
+                "first_token_s": first_token,
+                "prompt_chars": len(prompt),
+                "prompt_tokens_est": len(prompt) // CHARS_PER_TOKEN,
+                "response_chars": len(response)
+            })
+
+    def record_file(self, file_path, seconds):
+        with self._lock:
+            self.files[file_path] = self.files.get(file_path, 0.0) + seconds
+
+    def drain(self):
+        """
+        Return everything recorded so far and start over; used to ship
+        worker-process measurements back to the parent
+        """
+
+        with self._lock:
+            data = {
+                "phases": self.phases,
+                "llm_requests": self.llm_requests,
+                "files": self.files
+            }
+            self.reset()
+        return data
+
+    def merge(self, data):
+        for name, (calls, seconds) in data["phases"].items():
+            self.add(name, seconds, calls)
+
+        with self._lock:
+            self.llm_requests.extend(data["llm_requests"])
+            for file_path, seconds in data["files"].items():
+                self.files[file_path] = self.files.get(file_path, 0.0) + seconds
+
+    def summary(self, top_files=10):
+        latencies = sorted(request["latency_s"] for request in self.llm_requests)
+        prompts = [request["prompt_tokens_est"] for request in self.llm_requests]
+
+        llm = {"requests": len(latencies)}
+        if latencies:
+            llm.update({
+                "total_s": sum(latencies),
+                "mean_s": sum(latencies) / len(latencies),
+                "p50_s": latencies[len(latencies) // 2],
+                "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max_s": latencies[-1],
+                "mean_prompt_tokens_est": sum(prompts) / len(prompts),
+                "max_prompt_tokens_est": max(prompts)
+            })
+
+        slowest = sorted(self.files.items(), key=lambda item: item[1], reverse=True)
+
+        return {
+            "phases": {
+                name: {"calls": calls, "total_s": seconds, "mean_ms": seconds * 1000 / max(calls, 1)}
+                for name, (calls, seconds) in sorted(
+                    self.phases.items(), key=lambda item: item[1][1], reverse=True
+                )
+            },
+            "llm": llm,
+            "slowest_files": [
+                {"file": file_path, "total_s": seconds} for file_path, seconds in slowest[:top_files]
+            ]
+        }
+
+    def format_table(self, top_files=10):
+        summary = self.summary(top_files)
+        lines = ["", "PROFILE", f"{'phase':<32} {'calls':>9} {'total s':>10} {'mean ms':>10}"]
+
+        for name, entry in summary["phases"].items():
+            lines.append(
+                f"{name:<32} {entry['calls']:>9} {entry['total_s']:>10.4f} {entry['mean_ms']:>10.4f}"
+            )
+
+        llm = summary["llm"]
+        if llm["requests"]:
+            lines.append("")
+            lines.append(
+                f"LLM requests: {llm['requests']}  total {llm['total_s']:.2f}s  "
+                f"p50 {llm['p50_s']:.2f}s  p95 {llm['p95_s']:.2f}s  max {llm['max_s']:.2f}s  "
+                f"mean prompt ~{llm['mean_prompt_tokens_est']:.0f} tokens"
+            )
+
+        if summary["slowest_files"]:
+            lines.append("")
+            lines.append("Slowest files:")
+            for entry in summary["slowest_files"]:
+                lines.append(f"  {entry['total_s']:>10.4f}s  {entry['file']}")
+
+        return "\n".join(lines)
+
+    def write_json(self, path, top_files=10):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(top_files), file, indent=2)
+
+
+PROFILER = Profiler()
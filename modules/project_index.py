@@ -0,0 +1,554 @@
+"""
+Persistent project-wide index of definitions, imports and references.
+
+Each module is summarised once into rows of a SQLite database:
+
+    modules  path, module name, stat fingerprint, content hash, __all__
+    defs     top-level functions and classes, by qualified name
+    refs     qualified names a module uses ("pkg.mod.func")
+    edges    module-level imports, for the import graph
+
+update() re-summarises only files whose content hash changed, in
+parallel, and returns the qualified names whose status may have
+changed. The cross-file queries then look those names up in the index
+instead of re-parsing anything.
+
+Decorated definitions and tests are usually called by a framework
+(routes, fixtures, CLI commands, test runners) rather than by name, so
+the unused-definition queries leave them out.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+
+from modules.file_walker import normalize_path
+from modules.ingest import stat_fingerprint
+
+
+INDEX_VERSION = 2
+
+# Paths bound per IN (...) query, well under SQLite's variable limit
+SQL_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS modules (
+    path TEXT PRIMARY KEY, module TEXT NOT NULL, fingerprint TEXT,
+    hash TEXT NOT NULL, exports TEXT, error TEXT
+);
+CREATE TABLE IF NOT EXISTS defs (
+    path TEXT NOT NULL, qualname TEXT NOT NULL, name TEXT NOT NULL,
+    kind TEXT NOT NULL, line INTEGER NOT NULL, decorated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (path TEXT NOT NULL, qualname TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS edges (path TEXT NOT NULL, target TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS modules_module ON modules (module);
+CREATE INDEX IF NOT EXISTS defs_path ON defs (path);
+CREATE INDEX IF NOT EXISTS defs_qualname ON defs (qualname);
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+CREATE INDEX IF NOT EXISTS refs_qualname ON refs (qualname);
+CREATE INDEX IF NOT EXISTS edges_path ON edges (path);
+"""
+
+
+def module_name(path, root=""):
+    """
+    Dotted module name of `path` relative to the import root `root`
+    """
+
+    relative = os.path.relpath(path, root or ".") if root else path
+    parts = normalize_path(relative)[:-len(".py")].split("/")
+
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+
+    return ".".join(part for part in parts if part and part != ".")
+
+
+def _resolve_relative(module, is_package, target, level):
+    if not level:
+        return target or ""
+
+    parts = module.split(".") if module else []
+    if not is_package:
+        parts = parts[:-1]
+    if level > 1:
+        parts = parts[:len(parts) - (level - 1)]
+
+    return ".".join(parts + ([target] if target else []))
+
+
+def _module_level(body):
+    """
+    Statements executed at import time: the module body, including
+    if/try/with blocks, but not function or class bodies
+    """
+
+    for node in body:
+        yield node
+        if isinstance(node, (ast.If, ast.Try, ast.With)):
+            for block in (
+                getattr(node, "body", []), getattr(node, "orelse", []),
+                getattr(node, "finalbody", [])
+            ):
+                yield from _module_level(block)
+            for handler in getattr(node, "handlers", []):
+                yield from _module_level(handler.body)
+
+
+def _attribute_chain(node):
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None, ()
+    return node.id, tuple(reversed(parts))
+
+
+def summarize_module(code, module, is_package=False):
+    """
+    Extract the definitions, exports, import edges and qualified
+    references of one module
+    """
+
+    tree = ast.parse(code)
+
+    defs = []
+    exports = None
+    edges = set()
+
+    for node in _module_level(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            defs.append((node.name, "function", node.lineno, bool(node.decorator_list)))
+        elif isinstance(node, ast.ClassDef):
+            defs.append((node.name, "class", node.lineno, bool(node.decorator_list)))
+        elif isinstance(node, ast.Assign) and isinstance(node.value, (ast.List, ast.Tuple)):
+            if any(isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets):
+                exports = [
+                    element.value for element in node.value.elts
+                    if isinstance(element, ast.Constant) and isinstance(element.value, str)
+                ]
+        elif isinstance(node, ast.Import):
+            edges.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = _resolve_relative(module, is_package, node.module, node.level)
+            edges.add(base)
+            edges.update(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+
+    local = {name for name, _, _, _ in defs}
+    bindings = {}
+    refs = set()
+    loads = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    bindings[alias.asname] = alias.name
+                else:
+                    root = alias.name.split(".")[0]
+                    bindings[root] = root
+        elif isinstance(node, ast.ImportFrom):
+            base = _resolve_relative(module, is_package, node.module, node.level)
+            for alias in node.names:
+                if alias.name == "*":
+                    refs.add(f"{base}.*")
+                    continue
+                qualname = f"{base}.{alias.name}"
+                bindings[alias.asname or alias.name] = qualname
+                refs.add(qualname)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            loads.append((node.id, ()))
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Load):
+            root, attrs = _attribute_chain(node)
+            if root is not None:
+                loads.append((root, attrs))
+
+    # Bindings may come from imports anywhere in the file, so loads are
+    # resolved only once every import has been seen
+    for root, attrs in loads:
+        if root in bindings:
+            refs.add(".".join((bindings[root],) + attrs))
+        elif root in local and not attrs:
+            refs.add(f"{module}.{root}")
+
+    return {
+        "defs": defs,
+        "exports": exports,
+        "edges": sorted(edges),
+        "refs": sorted(refs)
+    }
+
+
+def summarize_file(path, module, fingerprint):
+    """
+    Read, hash and summarise one file; runs in a worker process
+    """
+
+    with open(path, "rb") as file:
+        data = file.read()
+
+    entry = {
+        "path": path,
+        "module": module,
+        "fingerprint": fingerprint,
+        "hash": hashlib.sha256(data).hexdigest()
+    }
+
+    try:
+        entry["summary"] = summarize_module(
+            data.decode("utf-8"), module, os.path.basename(path) == "__init__.py"
+        )
+    except (SyntaxError, UnicodeDecodeError, ValueError) as error:
+        entry["error"] = str(error)
+
+    return entry
+
+
+def _summarize_task(item):
+    return summarize_file(*item)
+
+
+class ProjectIndex:
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"project_index_v{INDEX_VERSION}.sqlite3")
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    # -----------------------------------
+    # UPDATE
+    # -----------------------------------
+
+    def update(self, files, jobs=1):
+        """
+        Bring the index in line with `files`, a list of (path, import root)
+        pairs. Returns (changed_paths, affected_qualnames).
+
+        Files whose stat fingerprint is unchanged are not read; the rest
+        are hashed and only re-summarised when their content changed.
+        Files no longer present are dropped.
+        """
+
+        known = {
+            path: (fingerprint, content_hash)
+            for path, fingerprint, content_hash in self._db.execute(
+                "SELECT path, fingerprint, hash FROM modules"
+            )
+        }
+
+        pending = []
+        current = set()
+
+        for path, root in files:
+            path = normalize_path(path)
+            current.add(path)
+
+            try:
+                fingerprint = stat_fingerprint(path, os.stat(path))
+            except FileNotFoundError:
+                continue
+
+            if fingerprint is not None and known.get(path, (None,))[0] == fingerprint:
+                continue
+
+            pending.append((path, module_name(path, root), fingerprint))
+
+        entries = self._summarize(pending, jobs)
+        removed = [path for path in known if path not in current]
+        changed = []
+        affected = set()
+
+        with self._db:
+            for entry in entries:
+                if known.get(entry["path"], (None, None))[1] == entry["hash"]:
+                    # Touched but identical: just remember the new stat
+                    self._db.execute(
+                        "UPDATE modules SET fingerprint = ? WHERE path = ?",
+                        (entry["fingerprint"], entry["path"])
+                    )
+                    continue
+
+                affected |= self._forget(entry["path"])
+                affected |= self._store(entry)
+                changed.append(entry["path"])
+
+            for path in removed:
+                affected |= self._forget(path)
+                changed.append(path)
+
+        return changed, affected
+
+    def _summarize(self, pending, jobs):
+        if jobs <= 1 or len(pending) <= 1:
+            return [summarize_file(*item) for item in pending]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(pending) // (jobs * 4))
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(_summarize_task, pending, chunksize=chunksize))
+
+    def _forget(self, path):
+        """
+        Delete a module's rows; returns the qualified names it defined
+        or referenced
+        """
+
+        affected = {row[0] for row in self._db.execute("SELECT qualname FROM defs WHERE path = ?", (path,))}
+        affected |= {row[0] for row in self._db.execute("SELECT qualname FROM refs WHERE path = ?", (path,))}
+
+        for table in ("modules", "defs", "refs", "edges"):
+            self._db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+        return affected
+
+    def _store(self, entry):
+        path, module = entry["path"], entry["module"]
+        summary = entry.get("summary") or {"defs": [], "exports": None, "edges": [], "refs": []}
+
+        self._db.execute(
+            "INSERT INTO modules (path, module, fingerprint, hash, exports, error) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                path, module, entry["fingerprint"], entry["hash"],
+                json.dumps(summary["exports"]) if summary["exports"] is not None else None,
+                entry.get("error")
+            )
+        )
+
+        defs = [
+            (path, f"{module}.{name}", name, kind, line, decorated)
+            for name, kind, line, decorated in summary["defs"]
+        ]
+        self._db.executemany("INSERT INTO defs VALUES (?, ?, ?, ?, ?, ?)", defs)
+        self._db.executemany("INSERT INTO refs VALUES (?, ?)", [(path, ref) for ref in summary["refs"]])
+        self._db.executemany("INSERT INTO edges VALUES (?, ?)", [(path, edge) for edge in summary["edges"]])
+
+        return {row[1] for row in defs} | set(summary["refs"])
+
+    # -----------------------------------
+    # QUERIES
+    # -----------------------------------
+
+    def _candidate_defs(self, qualnames, kinds):
+        placeholders = ", ".join("?" for _ in kinds)
+        query = (
+            "SELECT defs.path, modules.module, defs.qualname, defs.name, defs.kind, "
+            "defs.line, modules.exports FROM defs JOIN modules ON modules.path = defs.path "
+            f"WHERE defs.kind IN ({placeholders}) AND NOT defs.decorated"
+        )
+
+        if qualnames is None:
+            yield from self._db.execute(query + " ORDER BY defs.path, defs.line", kinds)
+            return
+
+        for qualname in sorted(qualnames):
+            yield from self._db.execute(query + " AND defs.qualname = ?", (*kinds, qualname))
+
+    def _references(self, qualname, module, outside=None):
+        """
+        Whether anything refers to `qualname`: the name itself or a star
+        import of its module, optionally only from paths other than `outside`
+        """
+
+        query = "SELECT 1 FROM refs WHERE qualname IN (?, ?)"
+        params = [qualname, f"{module}.*"]
+
+        if outside is not None:
+            query += " AND path != ?"
+            params.append(outside)
+
+        return self._db.execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def dead_functions(self, qualnames=None):
+        """
+        Top-level functions nothing in the project refers to, not even
+        their own module. With `qualnames`, only those are checked.
+        """
+
+        dead = []
+
+        for path, module, qualname, name, kind, line, exports in self._candidate_defs(qualnames, ("function",)):
+            if name.startswith("__") or _is_test(name, kind):
+                continue
+            if exports and name in json.loads(exports):
+                continue
+            if not self._references(qualname, module):
+                dead.append({"file": path, "symbol": qualname, "line": line})
+
+        return dead
+
+    def unused_public(self, qualnames=None):
+        """
+        Public top-level functions and classes no other module uses,
+        ignoring names listed in __all__
+        """
+
+        unused = []
+
+        for path, module, qualname, name, kind, line, exports in self._candidate_defs(
+            qualnames, ("function", "class")
+        ):
+            if name.startswith("_") or _is_test(name, kind):
+                continue
+            if exports and name in json.loads(exports):
+                continue
+            if not self._references(qualname, module, outside=path):
+                unused.append({"file": path, "symbol": qualname, "kind": kind, "line": line})
+
+        return unused
+
+    def import_graph(self):
+        """
+        {module: set of project modules it imports at import time}
+        """
+
+        modules = dict(self._db.execute("SELECT path, module FROM modules"))
+        known = set(modules.values())
+        graph = {module: set() for module in known}
+
+        for path, target in self._db.execute("SELECT path, target FROM edges"):
+            if target in known and target != modules[path]:
+                graph[modules[path]].add(target)
+
+        return graph
+
+    def _imports_of(self, module):
+        """
+        Project modules `module` imports, read from the index
+        """
+
+        return {
+            row[0] for row in self._db.execute(
+                "SELECT DISTINCT edges.target FROM modules AS source "
+                "JOIN edges ON edges.path = source.path "
+                "JOIN modules AS target ON target.module = edges.target "
+                "WHERE source.module = ? AND edges.target != ?",
+                (module, module)
+            )
+        }
+
+    def _reachable_graph(self, modules):
+        """
+        The import graph restricted to what `modules` reach, which holds
+        every cycle they can be part of
+        """
+
+        graph = {}
+        pending = list(modules)
+
+        while pending:
+            module = pending.pop()
+            if module in graph:
+                continue
+            graph[module] = self._imports_of(module)
+            pending.extend(graph[module] - graph.keys())
+
+        return graph
+
+    def import_cycles(self, paths=None):
+        """
+        Strongly connected components of the import graph with more
+        than one module; with `paths`, only those containing one of
+        them, found without loading the rest of the graph
+        """
+
+        if paths is None:
+            graph = self.import_graph()
+            wanted = None
+        else:
+            if not paths:
+                return []
+
+            # Batched, since SQLite caps the variables bound per statement
+            paths = list(paths)
+            wanted = set()
+            for start in range(0, len(paths), SQL_BATCH):
+                batch = paths[start:start + SQL_BATCH]
+                placeholders = ", ".join("?" for _ in batch)
+                wanted.update(row[0] for row in self._db.execute(
+                    f"SELECT module FROM modules WHERE path IN ({placeholders})", batch
+                ))
+            graph = self._reachable_graph(wanted)
+
+        cycles = [sorted(component) for component in _strongly_connected(graph) if len(component) > 1]
+
+        if wanted is not None:
+            cycles = [cycle for cycle in cycles if wanted.intersection(cycle)]
+
+        return sorted(cycles)
+
+
+def _is_test(name, kind):
+    if kind == "class":
+        return name.startswith("Test")
+    return name == "test" or name.startswith("test_")
+
+
+def _strongly_connected(graph):
+    """
+    Tarjan's algorithm, iterative so deep import chains cannot overflow
+    the recursion limit
+    """
+
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for start in graph:
+        if start in index:
+            continue
+
+        work = [(start, iter(sorted(graph[start])))]
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+
+        while work:
+            node, successors = work[-1]
+            advanced = False
+
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(sorted(graph[successor]))))
+                    advanced = True
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
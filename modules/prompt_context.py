@@ -0,0 +1,112 @@
+import ast
+
+
+DEFAULT_CONTEXT_WINDOW = 5
+DEFAULT_MAX_CONTEXT_TOKENS = 1500
+
+# Rough characters-per-token ratio for code, used for the budget cap
+CHARS_PER_TOKEN = 4
+
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def scope_spans(code):
+    """
+    Return (start, end) line spans of every function and class, decorators
+    included, innermost last for any given line
+    """
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, SCOPE_NODES):
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            spans.append((start, node.end_lineno))
+
+    # Wider scopes first, so the last match is the innermost one
+    return sorted(spans, key=lambda span: (span[0], -span[1]))
+
+
+def _enclosing_scope(span, scopes):
+    enclosing = None
+    for start, end in scopes:
+        if start <= span[0] and span[1] <= end:
+            if enclosing is None or end - start <= enclosing[1] - enclosing[0]:
+                enclosing = (start, end)
+    return enclosing
+
+
+def _render(lines, start, end):
+    width = len(str(end))
+    return "\n".join(
+        f"{number:>{width}} | {lines[number - 1]}"
+        for number in range(start, end + 1)
+    )
+
+
+def _fit_around(lines, span, max_chars):
+    """
+    Grow a region outwards from the issue line until the budget is spent
+    """
+
+    # Rendered cost of each line: number gutter, " | ", text and newline
+    gutter = len(str(len(lines))) + 4
+    cost = [gutter + len(line) for line in lines]
+
+    start = end = span[0]
+    used = cost[start - 1]
+
+    # Cover the issue span itself first
+    while end < min(span[1], len(lines)) and used + cost[end] <= max_chars:
+        used += cost[end]
+        end += 1
+
+    # Then alternate one line above and one below
+    grown = True
+    while grown:
+        grown = False
+        if start > 1 and used + cost[start - 2] <= max_chars:
+            start -= 1
+            used += cost[start - 1]
+            grown = True
+        if end < len(lines) and used + cost[end] <= max_chars:
+            used += cost[end]
+            end += 1
+            grown = True
+
+    return start, end, _render(lines, start, end)
+
+
+def extract_context(code, span=None, scopes=None, window=DEFAULT_CONTEXT_WINDOW,
+                    max_tokens=DEFAULT_MAX_CONTEXT_TOKENS):
+    """
+    Return (start, end, snippet) covering the function or class that
+    encloses the issue plus `window` surrounding lines, capped at roughly
+    `max_tokens` tokens. Without a span the whole file is used, subject
+    to the same cap.
+    """
+
+    lines = code.splitlines() or [""]
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    if span is None:
+        span = (1, len(lines))
+        region = span
+    else:
+        span = (max(1, span[0]), min(len(lines), span[1]))
+        if scopes is None:
+            scopes = scope_spans(code)
+        region = _enclosing_scope(span, scopes) or span
+
+    start = max(1, region[0] - window)
+    end = min(len(lines), region[1] + window)
+    text = _render(lines, start, end)
+
+    if len(text) <= max_chars:
+        return start, end, text
+
+    return _fit_around(lines, span, max_chars)
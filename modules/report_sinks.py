@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+SARIF_LEVELS = {
+    "ERROR": "error",
+    "WARNING": "warning",
+    "INFO": "note"
+}
+
+
+class CsvSink:
+    """
+    One consolidated CSV, one row per issue, written as each file finishes
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["File", "Issue", "Severity", "Line", "Feedback"])
+
+    def write(self, file_path, results):
+        for result in results:
+            self._writer.writerow([
+                file_path,
+                result.get("issue", ""),
+                result.get("severity", ""),
+                result.get("line", ""),
+                result.get("feedback", "")
+            ])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesSink:
+    """
+    One JSON object per issue per line
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, file_path, results):
+        for result in results:
+            self._file.write(json.dumps({"file": file_path, **result}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class SarifSink:
+    """
+    SARIF 2.1.0 log written incrementally: the envelope is opened up
+    front, results are appended as they arrive and the envelope is
+    closed on close(), so nothing is held in memory between files
+    """
+
+    def __init__(self, path, tool_name="codereviewer"):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._first = True
+
+        header = json.dumps({
+            "version": "2.1.0",
+            "$schema": SARIF_SCHEMA,
+            "runs": [{"tool": {"driver": {"name": tool_name}}, "results": []}]
+        })
+
+        # Split just before the closing of the empty results array
+        self._footer = "]}]}"
+        self._file.write(header[:-len(self._footer)])
+
+    def _sarif_result(self, file_path, result):
+        location = {
+            "physicalLocation": {
+                "artifactLocation": {"uri": file_path.replace(os.sep, "/")}
+            }
+        }
+
+        if result.get("line"):
+            location["physicalLocation"]["region"] = {
+                "startLine": result["line"],
+                "endLine": result.get("end_line") or result["line"]
+            }
+            if result.get("column") is not None:
+                location["physicalLocation"]["region"]["startColumn"] = result["column"] + 1
+
+        return {
+            "ruleId": result.get("issue", ""),
+            "level": SARIF_LEVELS.get(result.get("severity"), "note"),
+            "message": {"text": result.get("feedback") or result.get("issue", "")},
+            "locations": [location]
+        }
+
+    def write(self, file_path, results):
+        for result in results:
+            if not self._first:
+                self._file.write(",")
+            self._file.write(json.dumps(self._sarif_result(file_path, result)))
+            self._first = False
+        self._file.flush()
+
+    def close(self):
+        self._file.write(self._footer)
+        self._file.close()
+
+
+SINKS = {
+    "csv": CsvSink,
+    "jsonl": JsonLinesSink,
+    "sarif": SarifSink
+}
+
+
+def resolve_format(path, output_format=None):
+    """
+    Return the sink format for `path`, inferred from its extension
+    when not given explicitly
+    """
+
+    if output_format is None:
+        extension = os.path.splitext(path)[1].lower().lstrip(".")
+        output_format = {"ndjson": "jsonl"}.get(extension, extension)
+
+    if output_format not in SINKS:
+        raise ValueError(
+            f"Unknown report format '{output_format}', expected one of: {', '.join(SINKS)}"
+        )
+
+    return output_format
+
+
+def open_sink(path, output_format=None):
+    return SINKS[resolve_format(path, output_format)](path)
@@ -0,0 +1,114 @@
+ENTRY_POINT_GROUP = "codereviewer.rules"
+
+DEFAULT_SEVERITY = "INFO"
+
+# Bump when what a built-in rule reports changes, so cached analyses
+# made with the old rules are not reused
+RULES_VERSION = 1
+
+RULE_REGISTRY = {}
+
+# Rule name -> "distribution==version" for rules registered by plugins
+_PLUGIN_VERSIONS = {}
+
+_plugins_loaded = False
+
+
+class Rule:
+    """
+    A named check.
+
+    `handlers` is a list of (node_types, handler) pairs; only these node
+    types are dispatched to the rule. `finalizer` runs once after the
+    walk for rules that need whole-file state. Handlers shared between
+    rules (for example name tracking) are bound only once per engine.
+    """
+
+    def __init__(self, name, handlers=(), finalizer=None, severity=None):
+        self.name = name
+        self.handlers = list(handlers)
+        self.finalizer = finalizer
+        self.severity = severity
+
+    def __repr__(self):
+        return f"Rule({self.name!r})"
+
+
+def register_rule(rule):
+    RULE_REGISTRY[rule.name] = rule
+    return rule
+
+
+def rule_severity(name):
+    rule = RULE_REGISTRY.get(name)
+    if rule is not None and rule.severity:
+        return rule.severity
+    return DEFAULT_SEVERITY
+
+
+def load_plugin_rules():
+    """
+    Register third-party rules exposed through the "codereviewer.rules"
+    entry point group. An entry point may resolve to a Rule, an iterable
+    of Rules, or a callable returning either.
+    """
+
+    global _plugins_loaded
+
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    # Scanning installed distributions is the slow part of startup, so
+    # it only happens when a plugin rule might actually be needed
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        loaded = entry_point.load()
+
+        if callable(loaded) and not isinstance(loaded, Rule):
+            loaded = loaded()
+        if isinstance(loaded, Rule):
+            loaded = [loaded]
+
+        dist = getattr(entry_point, "dist", None)
+        version = f"{dist.name}=={dist.version}" if dist else entry_point.value
+
+        for rule in loaded:
+            register_rule(rule)
+            _PLUGIN_VERSIONS[rule.name] = version
+
+
+def select_rules(names=None):
+    """
+    Return (rules, unknown_names) for the enabled rule names; an empty
+    or missing list enables every registered rule. Plugins are only
+    discovered when a name is not a built-in rule, or for "all rules".
+    """
+
+    if not names or any(name not in RULE_REGISTRY for name in names):
+        load_plugin_rules()
+
+    if not names:
+        return list(RULE_REGISTRY.values()), []
+
+    rules = [RULE_REGISTRY[name] for name in names if name in RULE_REGISTRY]
+    unknown = [name for name in names if name not in RULE_REGISTRY]
+
+    return rules, unknown
+
+
+def rule_set_version(names=None):
+    """
+    Identity of the enabled rule set, for cache keys: the rule names,
+    RULES_VERSION and the versions of plugins providing any of them
+    """
+
+    rules, _ = select_rules(names)
+    enabled = sorted(rule.name for rule in rules)
+
+    return [
+        RULES_VERSION,
+        enabled,
+        sorted({_PLUGIN_VERSIONS[name] for name in enabled if name in _PLUGIN_VERSIONS})
+    ]
@@ -0,0 +1,113 @@
+import hashlib
+import io
+import os
+import posixpath
+import zipfile
+
+from modules.ingest import HEADER_BYTES, classify_header
+from modules.config_loader import load_config
+from modules.module1 import analyze_code, get_engine
+
+
+DEFAULT_MAX_FILE_SIZE_KB = 1024
+
+# Upper bound on what one archive may expand to, whatever it claims
+MAX_ARCHIVE_MB = 256
+
+
+def expand_uploads(uploads, max_file_size_kb=DEFAULT_MAX_FILE_SIZE_KB):
+    """
+    Turn uploaded (name, bytes) pairs, plain .py files or .zip archives,
+    into (sources, skipped): sources is a list of (path, bytes) for every
+    Python file, skipped a list of (path, reason)
+    """
+
+    sources = []
+    skipped = []
+    max_bytes = max_file_size_kb * 1024
+
+    def add(path, data):
+        reason = classify_header(data[:HEADER_BYTES])
+        if reason:
+            skipped.append((path, reason))
+        else:
+            sources.append((path, data))
+
+    for name, data in uploads:
+        if not name.lower().endswith(".zip"):
+            if max_bytes and len(data) > max_bytes:
+                skipped.append((name, f"larger than {max_file_size_kb} KB"))
+            else:
+                add(name, data)
+            continue
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            budget = MAX_ARCHIVE_MB * 1024 * 1024
+
+            for info in archive.infolist():
+                path = posixpath.normpath(info.filename)
+
+                if info.is_dir() or not path.endswith(".py"):
+                    continue
+                if path.startswith(("__MACOSX/", "../", "/")):
+                    continue
+
+                if max_bytes and info.file_size > max_bytes:
+                    skipped.append((path, f"larger than {max_file_size_kb} KB"))
+                    continue
+
+                budget -= info.file_size
+                if budget < 0:
+                    skipped.append((path, f"archive expands beyond {MAX_ARCHIVE_MB} MB"))
+                    continue
+
+                add(path, archive.read(info))
+
+    return sources, skipped
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def analyze_source(path, data):
+    """
+    Analyse one in-memory file; runs in a worker process. Returns a
+    plain dict so it pickles back cheaply.
+    """
+
+    outcome = {"file": path, "digest": content_digest(data)}
+
+    # The configured rules, as in the CLI gate
+    engine = get_engine(load_config()["rules"])
+
+    try:
+        records, structure = analyze_code(data.decode("utf-8"), engine)
+    except (SyntaxError, UnicodeDecodeError, ValueError) as error:
+        outcome["error"] = str(error)
+        return outcome
+
+    outcome.update(records=records, structure=structure)
+    return outcome
+
+
+def analyze_sources(sources, jobs=None):
+    """
+    Yield analyze_source outcomes as each file finishes, spreading the
+    files over a process pool when there is more than one
+    """
+
+    if len(sources) <= 1:
+        for path, data in sources:
+            yield analyze_source(path, data)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    jobs = min(jobs or os.cpu_count() or 1, len(sources))
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(analyze_source, path, data) for path, data in sources]
+
+        for future in as_completed(futures):
+            yield future.result()
@@ -3,12 +3,24 @@ import json
 import os
 import sys
 import csv
-import ast
+from functools import partial
 
-from modules.module1 import read_python_file, detect_issues_ast
-from modules.module2_ollama import build_results, build_results_with_ai
-from modules.module3 import aggregate_module3_results
+from modules.module1 import (
+    read_python_file, analyze_code, analyze_code_incremental, get_engine, issue_counts,
+    issue_scopes, issue_spans, set_profiling
+)
+from modules.engine import Issue
+from modules.rules import select_rules
+from modules.module3 import IssueTable, aggregate_module3_results, summarize_project
 from modules.config_loader import load_config
+from modules.cache import get_cache, cache_key, forget_inherited_caches
+from modules.profiler import PROFILER
+from modules.git_diff import GitError, changed_hunks, filter_to_hunks
+from modules.ingest import SkippedFile, inspect_file, sniff_file, stat_fingerprint
+from modules.report_sinks import SINKS, open_sink, resolve_format
+from modules.file_walker import (
+    compile_matcher, iter_python_files, matcher_from_config, normalize_path
+)
 
 
 SEVERITY_ORDER = {
@@ -23,7 +35,25 @@ SEVERITY_ORDER = {
 # -----------------------------------
 
 def should_exclude(file_path, exclude_paths):
-    return any(excluded in file_path for excluded in exclude_paths)
+    return compile_matcher(tuple(exclude_paths)).is_excluded(normalize_path(file_path))
+
+
+def severity_level(severity):
+    return SEVERITY_ORDER.get(str(severity).upper(), 1)
+
+
+def blocking_records(records, config):
+    """
+    Records at or above the configured severity_threshold, the ones that
+    fail the quality gate
+    """
+
+    threshold = severity_level(config["severity_threshold"])
+    return [record for record in records if severity_level(record.severity) >= threshold]
+
+
+def is_blocking(outcome, config):
+    return "error" in outcome or bool(blocking_records(outcome.get("records", ()), config))
 
 
 def normalize_results(results):
@@ -38,7 +68,8 @@ def sort_results(results):
         results,
         key=lambda result: (
             -SEVERITY_ORDER.get(result.get("severity", "INFO"), 1),
-            result.get("issue", "")
+            result.get("issue", ""),
+            result.get("line") or 0
         )
     )
 
@@ -48,103 +79,678 @@ def export_csv(results, file_path):
 
     with open(output_file, "w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
-        writer.writerow(["Issue", "Severity", "Feedback"])
+        writer.writerow(["Issue", "Severity", "Line", "Feedback"])
 
         for result in results:
             writer.writerow([
                 result.get("issue", ""),
                 result.get("severity", ""),
+                result.get("line", ""),
                 result.get("feedback", "")
             ])
 
     print(f"\nReport saved to {output_file}")
 
 
+def read_source(file_path):
+    with PROFILER.phase("read"):
+        return read_python_file(file_path)
+
+
+def load_analysis(file_path, config):
+    """
+    Pre-filter, then analyse a file. Returns (code, records, metrics);
+    code is None when an unchanged stat result allowed the open, header
+    sniff, read and decode to be skipped entirely. Raises SkippedFile.
+    """
+
+    with PROFILER.phase("ingest"):
+        stat = inspect_file(file_path, config, sniff=False)
+
+    cache = get_cache(config)
+    fingerprint = stat_fingerprint(file_path, stat)
+    # An entry only exists for a version that passed the sniff under the
+    # same skip_generated setting
+    stat_key = (
+        cache_key("stat", fingerprint, config, extra=config.get("skip_generated", False))
+        if fingerprint else None
+    )
+
+    if stat_key:
+        entry = cache.get(stat_key)
+        cached = cache.get(entry["analysis_key"]) if entry else None
+        if cached is not None:
+            return None, _load_records(cached), cached["metrics"]
+
+    with PROFILER.phase("ingest"):
+        sniff_file(file_path, stat, config)
+
+    code = read_source(file_path)
+    key = cache_key("analysis", code, config)
+    records, metrics = analyze_cached(code, config, key)
+
+    if stat_key:
+        cache.set(stat_key, {"analysis_key": key})
+
+    return code, records, metrics
+
+
+def _load_records(cached):
+    return [Issue.from_row(row) for row in cached["records"]]
+
+
+def analyze_cached(code, config, key=None):
+    cache = get_cache(config)
+    key = key or cache_key("analysis", code, config)
+
+    with PROFILER.phase("cache_lookup"):
+        cached = cache.get(key)
+
+    if cached is not None:
+        return _load_records(cached), cached["metrics"]
+
+    records, metrics = analyze_code(code, get_engine(config["rules"]))
+    cache.set(key, {"records": [record.to_row() for record in records], "metrics": metrics})
+
+    return records, metrics
+
+
+def analyze_changed(code, config, ranges):
+    """
+    Analyse a file reusing cached per-function fragments, and keep only
+    the issues that overlap the changed line ranges
+    """
+
+    cache = get_cache(config)
+
+    def load_fragment(key):
+        return cache.get(cache_key("fragment", key, config))
+
+    def save_fragment(key, fragment):
+        cache.set(cache_key("fragment", key, config), fragment)
+
+    records, metrics = analyze_code_incremental(
+        code, load_fragment, save_fragment, get_engine(config["rules"])
+    )
+
+    return filter_to_hunks(records, ranges), metrics
+
+
+def ai_cache_key(kind, issues, code, config):
+    return cache_key(kind, code, config, model=config["model"], extra=sorted(issues))
+
+
+def ai_results_cached(issues, code, config, records=()):
+    from concurrent.futures import CancelledError
+    from modules.module2_ollama import (
+        build_results, build_results_with_ai, client_from_config, is_cacheable
+    )
+
+    cache = get_cache(config)
+    model = config["model"]
+    key = ai_cache_key("ai", issues, code, config)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    reused, pending, remember = reuse_feedback(issues, config, records, claim=True)
+
+    def generate(wanted):
+        generated = []
+
+        try:
+            if wanted:
+                generated = build_results_with_ai(
+                    wanted,
+                    code,
+                    model,
+                    concurrency=config["ai_concurrency"],
+                    batch=config["ai_batch"],
+                    client=client_from_config(config),
+                    spans=issue_spans(records),
+                    context_window=config["context_window"],
+                    max_context_tokens=config["max_context_tokens"],
+                    scopes=issue_scopes(records)
+                )
+        except CancelledError:
+            # The run stopped early; nothing is cached for an abandoned file
+            raise
+        except Exception:
+            generated = build_results(wanted)
+        finally:
+            remember(wanted, generated)
+
+        return generated
+
+    missing = [issue for issue in issues if issue not in reused and issue not in pending]
+    answered = {**reused, **dict(zip(missing, generate(missing)))}
+
+    # Issues another file in flight was already asking about: take its
+    # answer once ready, or ask ourselves when it got none
+    late = []
+    for issue, wait in pending.items():
+        result = wait()
+        if result is None:
+            late.append(issue)
+        else:
+            answered[issue] = result
+
+    answered.update(zip(late, generate(late)))
+    results = [answered[issue] for issue in issues]
+
+    if is_cacheable(results):
+        cache.set(key, results)
+
+    return results
+
+
+def reuse_feedback(issues, config, records, claim=False):
+    """
+    Look issues up in the fingerprint store. Returns (reused, pending,
+    remember):
+
+    - reused maps the issues answered before to their result;
+    - with claim=True, pending maps issues that another file in flight
+      is generating to a function waiting for its answer (None when it
+      got none), and every other miss is claimed by the caller;
+    - remember(issues, results) stores the real answers among results
+      generated for those issues and releases their claims. Results are
+      matched to issues by position, never by the issue text the model
+      echoed back. Claimed issues must be passed even without a result.
+    """
+
+    if not (config.get("feedback_reuse") and config["cache"]) or not records:
+        return {}, {}, lambda issues, results: None
+
+    from modules.fingerprint import get_feedback_store, issue_fingerprints
+    from modules.module2_ollama import is_cacheable
+
+    store = get_feedback_store(config)
+    fingerprints = issue_fingerprints(records)
+
+    reused = {}
+    pending = {}
+    claimed = set()
+
+    for issue in issues:
+        fingerprint = fingerprints.get(issue)
+        if fingerprint is None:
+            continue
+
+        result = store.get(fingerprint)
+        if result is not None:
+            reused[issue] = result
+        elif claim:
+            owner = store.claim(fingerprint)
+            if owner is None:
+                claimed.add(fingerprint)
+            else:
+                pending[issue] = partial(store.wait, fingerprint, owner)
+
+    def remember(issues, results):
+        results = list(results)
+
+        for index, issue in enumerate(issues):
+            fingerprint = fingerprints.get(issue)
+            if fingerprint is None:
+                continue
+
+            result = results[index] if index < len(results) else None
+            if result is not None and not is_cacheable([result]):
+                result = None
+
+            if fingerprint in claimed:
+                claimed.discard(fingerprint)
+                store.release(fingerprint, result)
+            elif result is not None:
+                store.set(fingerprint, result)
+
+    return reused, pending, remember
+
+
+def print_feedback_reuse():
+    if "modules.fingerprint" not in sys.modules:
+        return
+
+    from modules.fingerprint import drain_reuse_stats
+
+    lookups, hits = drain_reuse_stats()
+    if lookups:
+        print(f"\nFeedback reuse: {hits} of {lookups} issues ({hits / lookups:.0%})")
+
+
+def print_offline_count(config):
+    if "modules.module2_ollama" not in sys.modules:
+        return
+
+    from modules.module2_ollama import drain_offline_count
+
+    offline = drain_offline_count()
+    if offline:
+        print(
+            f"\nLLM deadline of {config['ai_deadline_s']}s reached: "
+            f"{offline} issues were given offline results"
+        )
+
+
+def print_results(results):
+    for result in results:
+        print("\nIssue:", result.get("issue"))
+        print("Severity:", result.get("severity"))
+        print("Feedback:", result.get("feedback"))
+
+
+def stream_review(issues, code, config, records=()):
+    """
+    Print feedback token by token as Ollama produces it, then return the
+    assembled results. Issues are streamed in the order sort_results
+    would print them.
+    """
+
+    from modules.module2_ollama import classify_severity, client_from_config, stream_results_with_ai
+
+    ordered = sorted(
+        issues,
+        key=lambda issue: (-SEVERITY_ORDER.get(classify_severity(issue), 1), issue)
+    )
+    results = []
+
+    reused, _, remember = reuse_feedback(ordered, config, records)
+
+    for issue in ordered:
+        if issue in reused:
+            result = normalize_results([dict(reused[issue])])[0]
+            result["severity"] = classify_severity(issue)
+            print("\nIssue:", issue)
+            print("Severity:", result.get("severity"))
+            print("Feedback:", result.get("feedback"))
+            results.append(result)
+
+    events = stream_results_with_ai(
+        [issue for issue in ordered if issue not in reused],
+        code,
+        config["model"],
+        client=client_from_config(config),
+        spans=issue_spans(records),
+        context_window=config["context_window"],
+        max_context_tokens=config["max_context_tokens"],
+        scopes=issue_scopes(records)
+    )
+
+    for kind, issue, payload in events:
+        if kind == "start":
+            print("\nIssue:", issue)
+            print("Severity:", payload)
+            print("Feedback: ", end="", flush=True)
+        elif kind == "token":
+            print(payload, end="", flush=True)
+        else:
+            print()
+            results.append(payload)
+            remember([issue], [payload])
+
+    return results
+
+
 # -----------------------------------
 # SCAN
 # -----------------------------------
 
-def scan_file(file_path, config):
+def collect_scan(file_path, config, ranges=None):
+    """
+    Analyse one file without printing, so it can run in a worker process.
+    With `ranges`, only issues touching those changed lines are counted.
+    When profiling, the worker's measurements travel back in "profile".
+    """
+
+    if config.get("profile") and not PROFILER.enabled:
+        set_profiling(True)
+
+    with PROFILER.track_file(file_path):
+        outcome = _scan_one(file_path, config, ranges)
+
+    if PROFILER.enabled:
+        outcome["profile"] = PROFILER.drain()
+
+    return outcome
+
+
+def _scan_one(file_path, config, ranges):
     if should_exclude(file_path, config["exclude_paths"]):
-        return 0
+        return {"file": file_path, "skipped": True}
 
     try:
-        code = read_python_file(file_path)
-        tree = ast.parse(code)
-    except (SyntaxError, FileNotFoundError) as error:
-        print(f"Error processing {file_path}: {error}")
-        return 1
-
-    issues = detect_issues_ast(code)
+        if ranges is None:
+            _, records, structure = load_analysis(file_path, config)
+        else:
+            with PROFILER.phase("ingest"):
+                inspect_file(file_path, config)
+            code = read_source(file_path)
+            records, structure = analyze_changed(code, config, ranges)
+    except SkippedFile as reason:
+        return {"file": file_path, "skipped": True, "reason": str(reason)}
+    except (SyntaxError, UnicodeDecodeError, FileNotFoundError) as error:
+        return {"file": file_path, "error": str(error)}
 
     metrics = {
         "file": file_path,
-        "functions": sum(isinstance(node, ast.FunctionDef) for node in ast.walk(tree)),
-        "classes": sum(isinstance(node, ast.ClassDef) for node in ast.walk(tree)),
-        "loops": sum(isinstance(node, (ast.For, ast.While)) for node in ast.walk(tree)),
-        "conditionals": sum(isinstance(node, ast.If) for node in ast.walk(tree)),
-        "total_issues": len(issues)
+        **structure,
+        "total_issues": len(records)
     }
 
+    outcome = {
+        "file": file_path,
+        "metrics": metrics,
+        "blocking": len(blocking_records(records, config))
+    }
+
+    if config.get("project_summary"):
+        outcome["issues"] = [(record.rule, record.severity) for record in records]
+
+    return outcome
+
+
+def print_scan(outcome):
+    if outcome.get("skipped"):
+        if outcome.get("reason"):
+            print(f"Skipped {outcome['file']}: {outcome['reason']}")
+        return 0
+
+    if "error" in outcome:
+        print(f"Error processing {outcome['file']}: {outcome['error']}")
+        return 1
+
     print("\nSCAN SUMMARY")
-    print(json.dumps(metrics, indent=4))
+    print(json.dumps(outcome["metrics"], indent=4))
+
+    return outcome["blocking"]
+
+
+def scan_file(file_path, config):
+    return print_scan(collect_scan(file_path, config))
+
+
+def _scan_task(config, file_path, ranges):
+    return collect_scan(file_path, config, ranges)
 
-    return len(issues)
+
+def scan_files(file_paths, config, jobs=1, changed=None):
+    """
+    Yield scan outcomes in input order, spreading files over a process
+    pool when jobs > 1. `changed` maps paths to changed line ranges.
+    """
+
+    changed = changed or {}
+    ranges = [changed.get(file_path) for file_path in file_paths]
+
+    if jobs <= 1 or len(file_paths) <= 1:
+        for file_path, file_ranges in zip(file_paths, ranges):
+            yield collect_scan(file_path, config, file_ranges)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # With fail_fast, files go out one at a time so that stopping early
+    # leaves little already-dispatched work to wait for
+    if config.get("fail_fast"):
+        chunksize = 1
+    else:
+        chunksize = max(1, len(file_paths) // (jobs * 4))
+
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=forget_inherited_caches)
+
+    try:
+        yield from executor.map(
+            partial(_scan_task, config),
+            file_paths,
+            ranges,
+            chunksize=chunksize
+        )
+    finally:
+        # Closed early (fail_fast): files not yet started are dropped
+        executor.shutdown(cancel_futures=True)
 
 
 # -----------------------------------
-# REVIEW
+# REVIEW / REPORT PIPELINE
 # -----------------------------------
 
-def review_file(file_path):
+def analyze_for_ai(file_path, config, in_worker=False):
+    """
+    CPU half of review and report: pre-filter and analyse one file.
+    Returns {"file", "code", "records"} or {"file", "message"} for a file
+    that was missing, skipped or unreadable; the latter also carry
+    "error" and fail the quality gate. Safe to run in a worker process.
+    """
+
+    if in_worker and config.get("profile") and not PROFILER.enabled:
+        set_profiling(True)
+
+    with PROFILER.track_file(file_path):
+        try:
+            code, records, _ = load_analysis(file_path, config)
+            outcome = {"file": file_path, "code": code, "records": records}
+        except FileNotFoundError:
+            outcome = {"file": file_path, "message": f"File not found: {file_path}"}
+        except (SyntaxError, UnicodeDecodeError) as error:
+            outcome = {
+                "file": file_path,
+                "message": f"Error processing {file_path}: {error}",
+                "error": str(error)
+            }
+        except SkippedFile as reason:
+            outcome = {"file": file_path, "message": f"Skipped {file_path}: {reason}"}
+
+    if in_worker and PROFILER.enabled:
+        outcome["profile"] = PROFILER.drain()
+
+    return outcome
+
+
+def _analysis_task(config, in_worker, file_path):
+    return analyze_for_ai(file_path, config, in_worker)
+
+
+def _source(outcome):
+    if outcome["code"] is None:
+        outcome["code"] = read_source(outcome["file"])
+    return outcome["code"]
+
+
+def review_results(outcome, config):
+    """
+    LLM half of review, without streaming: attach sorted results
+    """
+
+    if "message" in outcome or not outcome["records"]:
+        return outcome
+
+    issues = list(issue_counts(outcome["records"]))
+    results = normalize_results(
+        ai_results_cached(issues, _source(outcome), config, outcome["records"])
+    )
+
+    # Severity is the rule's, as in the gate, never what the model wrote
+    severities = {record.rule: record.severity for record in outcome["records"]}
+    for issue, result in zip(issues, results):
+        result["severity"] = severities[issue]
+
+    outcome["results"] = sort_results(results)
+
+    return outcome
+
+
+def report_results(outcome, config):
+    """
+    LLM half of report: attach one located result per issue occurrence
+    """
+
+    if "message" in outcome:
+        return outcome
+
+    records = outcome["records"]
+    if not records:
+        outcome["results"] = []
+        return outcome
+
+    issues = list(issue_counts(records))
+    # Results come back in issue order; pair them by position rather than
+    # trusting the issue name in the answer
+    feedback = dict(zip(
+        issues,
+        normalize_results(ai_results_cached(issues, _source(outcome), config, records))
+    ))
+
+    # Feedback is generated once per rule, then attached to every occurrence
+    results = []
+    for record in records:
+        result = feedback.get(record.rule, {})
+        located = {
+            "issue": record.rule,
+            "severity": record.severity,
+            "line": record.line,
+            "end_line": record.end_line,
+            "column": record.col,
+            "symbol": record.symbol,
+            "feedback": result.get("feedback", "")
+        }
+        if result.get("offline"):
+            located["offline"] = True
+        results.append(located)
+
+    outcome["results"] = sort_results(results)
+    return outcome
+
+
+def iter_ai_outcomes(file_paths, config, complete, jobs=1):
+    """
+    Yield each file's completed outcome in input order. With several
+    files, analysis runs ahead in workers while earlier files wait on
+    the LLM (see modules.pipeline); otherwise files go one by one.
+    """
+
+    depth = config.get("pipeline_depth", 0)
+
+    if len(file_paths) > 1 and depth > 0:
+        from modules.pipeline import pipelined
+
+        outcomes = pipelined(
+            file_paths,
+            partial(_analysis_task, config, jobs > 1),
+            partial(complete, config=config),
+            jobs=jobs,
+            depth=depth,
+            initializer=forget_inherited_caches
+        )
+    else:
+        outcomes = (complete(analyze_for_ai(file_path, config), config) for file_path in file_paths)
+
     try:
-        code = read_python_file(file_path)
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return
+        for outcome in outcomes:
+            if "profile" in outcome:
+                PROFILER.merge(outcome.pop("profile"))
+            yield outcome
+    except GeneratorExit:
+        # Closed early (fail_fast): cancel the LLM requests still queued
+        # for files in flight, so closing waits only for those being sent
+        if "modules.llm_scheduler" in sys.modules:
+            from modules.llm_scheduler import stop_run
+            stop_run()
+        raise
+    finally:
+        outcomes.close()
 
-    issues = detect_issues_ast(code)
 
-    if not issues:
+def print_review(outcome):
+    if "message" in outcome:
+        print(outcome["message"])
+        return
+
+    if not outcome.get("results"):
         print("No issues detected.")
         return
 
-    try:
-        results = build_results_with_ai(issues, code)
-    except Exception:
-        results = build_results(issues)
+    print(f"\nCODE REVIEW: {outcome['file']}")
+
+    print_results(outcome["results"])
+
 
-    results = normalize_results(results)
-    results = sort_results(results)
+def review_file(file_path, config):
+    """
+    Review one file, streaming feedback as it is generated. Returns the
+    file's analysis outcome.
+    """
+
+    outcome = analyze_for_ai(file_path, config)
+
+    if "message" in outcome or not outcome["records"] or not (
+        config["stream"] and not config["ai_batch"]
+    ):
+        print_review(review_results(outcome, config))
+        return outcome
+
+    records = outcome["records"]
+    issues = list(issue_counts(records))
+    code = _source(outcome)
+
+    cache = get_cache(config)
+    key = ai_cache_key("ai_stream", issues, code, config)
+    cached = cache.get(key)
+
+    if cached is not None:
+        print_review({**outcome, "results": sort_results(normalize_results(cached))})
+        return outcome
+
+    from modules.module2_ollama import is_cacheable
 
     print(f"\nCODE REVIEW: {file_path}")
 
-    for result in results:
-        print("\nIssue:", result.get("issue"))
-        print("Severity:", result.get("severity"))
-        print("Feedback:", result.get("feedback"))
+    results = stream_review(issues, code, config, records)
+    results = sort_results(normalize_results(results))
 
+    if is_cacheable(results):
+        cache.set(key, results)
 
-# -----------------------------------
-# REPORT
-# -----------------------------------
+    return outcome
 
-def report_file(file_path):
-    try:
-        code = read_python_file(file_path)
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return
 
-    issues = detect_issues_ast(code)
+def review_files(file_paths, config, jobs=1):
+    """
+    Review every file. With fail_fast, stop after the first blocking file
+    (see is_blocking), dropping queued analyses and LLM requests, and
+    return its outcome.
+    """
 
-    try:
-        results = build_results_with_ai(issues, code)
-    except Exception:
-        results = build_results(issues)
+    fail_fast = config.get("fail_fast")
+
+    if len(file_paths) == 1 or config.get("pipeline_depth", 0) <= 0:
+        for file_path in file_paths:
+            outcome = review_file(file_path, config)
+            if fail_fast and is_blocking(outcome, config):
+                return outcome
+        return None
+
+    outcomes = iter_ai_outcomes(file_paths, config, review_results, jobs)
+
+    for outcome in outcomes:
+        print_review(outcome)
+        if fail_fast and is_blocking(outcome, config):
+            outcomes.close()
+            return outcome
 
-    results = normalize_results(results)
-    results = sort_results(results)
+    return None
+
+
+def print_report(outcome, table=None):
+    if "message" in outcome:
+        print(outcome["message"])
+        return
+
+    file_path, results = outcome["file"], outcome["results"]
+
+    if table is not None:
+        table.add_file(file_path, _result_issues(results))
 
     if not results:
         print("No issues found.")
@@ -155,54 +761,397 @@ def report_file(file_path):
     print("\nSUMMARY")
     print(json.dumps(summary, indent=4))
 
-    export_csv(results, file_path)
+    with PROFILER.phase("export"):
+        export_csv(results, file_path)
+
+
+def _result_issues(results):
+    return ((result.get("issue"), result.get("severity")) for result in results)
+
+
+def report_files(file_paths, config, output_path, output_format=None, table=None, jobs=1):
+    """
+    Stream every file's results into one consolidated report as soon as
+    the file is done; only running totals (and, with `table`, the issue
+    columns for the project summary) are kept in memory. With fail_fast,
+    the report stops after the first blocking file (see is_blocking),
+    whose outcome is returned.
+    """
+
+    sink = open_sink(output_path, output_format)
+    totals = {"files": 0, "files_with_issues": 0, "total_issues": 0}
+    severities = dict.fromkeys(SEVERITY_ORDER, 0)
+    outcomes = iter_ai_outcomes(file_paths, config, report_results, jobs)
+    blocked = None
+
+    try:
+        for outcome in outcomes:
+            if "message" in outcome:
+                print(outcome["message"])
+                if config.get("fail_fast") and is_blocking(outcome, config):
+                    blocked = outcome
+                    break
+                continue
+
+            file_path, results = outcome["file"], outcome["results"]
+
+            with PROFILER.phase("export"):
+                sink.write(file_path, results)
+
+            if table is not None:
+                table.add_file(file_path, _result_issues(results))
+
+            totals["files"] += 1
+            totals["files_with_issues"] += bool(results)
+            totals["total_issues"] += len(results)
+            for result in results:
+                severity = result.get("severity", "INFO")
+                severities[severity] = severities.get(severity, 0) + 1
+
+            if config.get("fail_fast") and is_blocking(outcome, config):
+                blocked = outcome
+                break
+    finally:
+        outcomes.close()
+        sink.close()
+
+    print("\nSUMMARY")
+    print(json.dumps({**totals, "severities": severities}, indent=4))
+    print(f"\nReport saved to {output_path}")
+
+    return blocked
+
+
+def print_project_summary(table):
+    with PROFILER.phase("summary"):
+        summary = summarize_project(table)
+
+    print("\nPROJECT SUMMARY")
+    print(json.dumps(summary, indent=4))
+
+
+# -----------------------------------
+# PROJECT INDEX
+# -----------------------------------
+
+def index_project(paths, config, jobs=1, report_all=False):
+    """
+    Update the persistent project index for `paths` and print the
+    cross-module findings affected by what changed (or all of them).
+    Each directory given is treated as an import root.
+    """
+
+    from modules.project_index import ProjectIndex
+
+    matcher = matcher_from_config(config)
+    files = []
+    for path in paths:
+        root = path if os.path.isdir(path) else ""
+        files.extend((file_path, root) for file_path in iter_python_files([path], matcher))
+
+    index = ProjectIndex(config["cache_dir"])
+
+    try:
+        with PROFILER.phase("index"):
+            changed, affected = index.update(files, jobs)
+
+        with PROFILER.phase("index_queries"):
+            findings = {
+                "dead_functions": index.dead_functions(None if report_all else affected),
+                "unused_public": index.unused_public(None if report_all else affected),
+                "import_cycles": index.import_cycles(None if report_all else changed)
+            }
+    finally:
+        index.close()
+
+    print(f"Indexed {len(files)} files, {len(changed)} changed")
+
+    for section, entries in findings.items():
+        print(f"\n{section.upper().replace('_', ' ')} ({len(entries)})")
+        for entry in entries:
+            if isinstance(entry, dict):
+                print(f"  {entry['file']}:{entry['line']}  {entry['symbol']}")
+            else:
+                print(f"  {' -> '.join(entry)}")
 
 
 # -----------------------------------
 # MAIN
 # -----------------------------------
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Professional Python Code Reviewer"
     )
 
     parser.add_argument(
         "command",
-        choices=["scan", "review", "report"]
+        choices=["scan", "review", "report", "index", "serve"],
+        help="index updates the project symbol index and reports cross-module "
+             "findings; serve starts a daemon that keeps state warm between runs"
     )
 
     parser.add_argument(
         "files",
-        nargs="+",
-        help="Python files to analyze"
+        nargs="*",
+        help="Python files or directories to analyze"
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="Scan only staged changes, reporting issues on changed lines"
+    )
+
+    parser.add_argument(
+        "--base",
+        metavar="REF",
+        help="Like --changed, but diff the branch against REF instead of the index"
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for scan, and for the analysis that runs "
+             "ahead of the LLM in review/report (0 = one per CPU)"
+    )
+
+    parser.add_argument(
+        "--ai-concurrency",
+        type=int,
+        help="Maximum number of concurrent Ollama requests across the run"
+    )
+
+    parser.add_argument(
+        "--ai-batch",
+        action="store_true",
+        help="Ask for feedback on all issues of a file in a single prompt"
+    )
+
+    parser.add_argument(
+        "-o", "--output",
+        help="Write one consolidated report for all files (report command)"
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=sorted(SINKS),
+        help="Consolidated report format (default: from the --output extension)"
+    )
+
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Wait for complete feedback instead of streaming it; only a "
+             "single-file review streams"
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-phase, per-rule and LLM timing to stderr when done"
+    )
+
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Write the profile summary as JSON to PATH"
+    )
+
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="index: report findings for the whole project, not just what changed"
+    )
+
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print a project rollup (per file, directory and rule) for scan and report"
+    )
+
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Wall-clock budget for LLM feedback in review/report; issues not "
+             "reviewed in time get offline results (0 = no limit)"
+    )
+
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first file with an issue at or above severity_threshold "
+             "and exit 1, skipping the remaining files"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the on-disk result cache"
+    )
+
+    args = parser.parse_intermixed_args(argv)
+
+    if args.command == "serve":
+        from modules.daemon import serve
+
+        return serve(load_config()["cache_dir"])
+
+    if not args.files and not (args.changed or args.base or args.command == "index"):
+        parser.error("the following arguments are required: files")
+
+    if args.output:
+        try:
+            args.format = resolve_format(args.output, args.format)
+        except ValueError as error:
+            parser.error(str(error))
+
     config = load_config()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    if args.no_cache:
+        config["cache"] = False
+    if args.ai_concurrency is not None:
+        config["ai_concurrency"] = args.ai_concurrency
+    if args.ai_batch:
+        config["ai_batch"] = True
+    if args.no_stream:
+        config["stream"] = False
+    if args.summary:
+        config["project_summary"] = True
+    if args.fail_fast:
+        config["fail_fast"] = True
+    if args.deadline is not None:
+        config["ai_deadline_s"] = args.deadline
+
+    _, unknown_rules = select_rules(config["rules"])
+    if unknown_rules:
+        print(
+            f"Warning: unknown rules ignored: {', '.join(unknown_rules)}",
+            file=sys.stderr
+        )
+
+    if args.profile or args.profile_json:
+        config["profile"] = True
+        set_profiling(True)
+
+    try:
+        run_command(args, config, jobs)
+    finally:
+        get_cache(config).prune()
+
+        if args.profile:
+            print(PROFILER.format_table(), file=sys.stderr)
+        if args.profile_json:
+            PROFILER.write_json(args.profile_json)
+
+
+def run_command(args, config, jobs):
+    if args.command == "index":
+        index_project(args.files or ["."], config, jobs, args.all)
+        return
+
+    changed = None
+
+    matcher = matcher_from_config(config)
+
+    if args.changed or args.base:
+        try:
+            hunks = changed_hunks(args.base, args.files)
+        except GitError as error:
+            print(f"git diff failed: {error}", file=sys.stderr)
+            sys.exit(2)
+
+        # Explicit paths reach git as pathspecs, so changed files are
+        # filtered here like a directory walk would filter them
+        changed = {
+            path: ranges for path, ranges in hunks.items()
+            if matcher.is_included(normalize_path(path))
+            and not matcher.is_excluded(normalize_path(path))
+        }
+        files = list(changed)
+    else:
+        files = list(iter_python_files(args.files, matcher))
+
+    table = IssueTable() if config.get("project_summary") else None
+
+    threshold = config["severity_threshold"]
 
     if args.command == "scan":
         has_issues = False
+        skipped = 0
+        outcomes = scan_files(files, config, jobs, changed)
 
-        for file_path in args.files:
-            issue_count = scan_file(file_path, config)
-            if issue_count > 0:
+        for outcome in outcomes:
+            if "profile" in outcome:
+                PROFILER.merge(outcome.pop("profile"))
+            if outcome.get("reason"):
+                skipped += 1
+            if table is not None and "metrics" in outcome:
+                table.add_file(outcome["file"], outcome.pop("issues"))
+            blocking = print_scan(outcome)
+            if blocking > 0:
                 has_issues = True
+                if config.get("fail_fast"):
+                    outcomes.close()
+                    print(f"\nStopped at {outcome['file']} (--fail-fast).")
+                    break
+
+        if table is not None:
+            print_project_summary(table)
+
+        if skipped:
+            print(f"\n{skipped} files were skipped and not checked (see above).")
 
         if has_issues:
-            print("\nQuality gate failed. Commit blocked.")
+            print(f"\nQuality gate failed: issues at or above {threshold}. Commit blocked.")
             sys.exit(1)
 
-        print("\nNo issues detected.")
+        print(f"\nNo issues at or above {threshold} detected.")
         sys.exit(0)
 
+    blocked = None
+
+    if args.command in ("review", "report"):
+        from modules.llm_scheduler import set_deadline
+        from modules.module2_ollama import warm_up
+
+        set_deadline(config["ai_deadline_s"])
+        warm_up(config)
+
     if args.command == "review":
-        for file_path in args.files:
-            review_file(file_path)
+        blocked = review_files(files, config, jobs)
+        print_feedback_reuse()
+        print_offline_count(config)
 
     if args.command == "report":
-        for file_path in args.files:
-            report_file(file_path)
+        if args.output:
+            blocked = report_files(files, config, args.output, args.format, table, jobs)
+        else:
+            outcomes = iter_ai_outcomes(files, config, report_results, jobs)
+            for outcome in outcomes:
+                print_report(outcome, table)
+                if config.get("fail_fast") and is_blocking(outcome, config):
+                    outcomes.close()
+                    blocked = outcome
+                    break
+
+        print_feedback_reuse()
+        print_offline_count(config)
+
+        if table is not None:
+            print_project_summary(table)
+
+    if blocked is not None:
+        if "error" in blocked:
+            reason = "it could not be processed"
+        else:
+            reason = f"issues at or above {threshold}"
+        print(f"\nStopped at {blocked['file']} (--fail-fast): {reason}.")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
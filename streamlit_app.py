@@ -1,15 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import ast
-import tempfile
-import os
 
-from modules.module1 import read_python_file, detect_issues_ast
-from modules.module2_ollama import build_results_with_ai, build_results
-from modules.module3 import aggregate_module3_results
+from modules.module1 import issue_counts, issue_scopes, issue_spans, STRUCTURE_METRICS
+from modules.module2_ollama import DEFAULT_MODEL, stream_results_with_ai, is_cacheable
+from modules.module3 import IssueTable, aggregate_module3_results, summarize_project
+from modules.upload import analyze_sources, content_digest, expand_uploads
 
 
+# Analyses kept in memory for the whole server, across sessions
+MAX_CACHED_ANALYSES = 4096
+
+# Per-issue AI results kept in memory, likewise
+MAX_CACHED_AI_RESULTS = 16384
+
 # -----------------------------------
 # PAGE CONFIG
 # -----------------------------------
@@ -25,34 +29,121 @@ st.markdown("### Professional code quality analysis & intelligent feedback")
 
 st.divider()
 
+# -----------------------------------
+# CACHING
+# -----------------------------------
+
+# Streamlit reruns this script on every interaction; analysis and AI
+# feedback are keyed on each file's content hash so a rerun (a tab
+# click, a widget change) reuses them instead of recomputing.
+
+@st.cache_resource
+def analysis_store():
+    """
+    Per-file analyses by content hash, shared by every session
+    """
+
+    return {}
+
+
+@st.cache_resource
+def ai_result_store():
+    """
+    AI results by (content hash, model, issue), shared by every session
+    of this server so the Ollama host is asked once per distinct issue
+    """
+
+    return {}
+
+
+def analyze_project(sources):
+    """
+    Analyse every (path, bytes) source, reusing cached analyses and
+    spreading the rest over a worker pool with a progress bar
+    """
+
+    store = analysis_store()
+    outcomes = {}
+    pending = []
+
+    for path, data in sources:
+        cached = store.get(content_digest(data))
+        if cached is not None:
+            outcomes[path] = {**cached, "file": path}
+        else:
+            pending.append((path, data))
+
+    if pending:
+        progress = st.progress(0.0, text=f"Analysing {len(pending)} files...")
+
+        for done, outcome in enumerate(analyze_sources(pending), 1):
+            outcomes[outcome["file"]] = outcome
+            if "error" not in outcome:
+                store[outcome["digest"]] = outcome
+
+            progress.progress(
+                done / len(pending),
+                text=f"Analysed {done}/{len(pending)}: {outcome['file']}"
+            )
+
+        progress.empty()
+
+        while len(store) > MAX_CACHED_ANALYSES:
+            store.pop(next(iter(store)), None)
+
+    return [outcomes[path] for path, _ in sources]
+
+
+def issue_frame(analyses):
+    """
+    One row per issue occurrence across the project
+    """
+
+    rows = [
+        (analysis["file"], record.rule, record.severity, record.line, record.col, record.symbol)
+        for analysis in analyses
+        for record in analysis["records"]
+    ]
+
+    return pd.DataFrame(rows, columns=["file", "issue", "severity", "line", "column", "symbol"])
+
+
 # -----------------------------------
 # FILE UPLOAD
 # -----------------------------------
 
-uploaded_file = st.file_uploader("📂 Upload Python File", type=["py"])
+uploaded_files = st.file_uploader(
+    "📂 Upload Python files or a zip archive of a project",
+    type=["py", "zip"],
+    accept_multiple_files=True
+)
 
-if uploaded_file:
+if uploaded_files:
 
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as tmp:
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
+    # Analysed straight from the upload buffers, no temp files
+    sources, skipped = expand_uploads(
+        (uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files
+    )
 
-    try:
-        code = read_python_file(tmp_path)
-        issues = detect_issues_ast(code)
-    except Exception as e:
-        st.error(f"Error processing file: {e}")
-        os.unlink(tmp_path)
+    if not sources:
+        st.error("No Python files found in the upload.")
         st.stop()
 
-    # Offline results always available
-    results_offline = build_results(issues)
+    code_by_file = dict(sources)
+    analyses = analyze_project(sources)
+
+    failed = [analysis for analysis in analyses if "error" in analysis]
+    analyses = [analysis for analysis in analyses if "error" not in analysis]
+
+    for analysis in failed:
+        st.error(f"Error processing {analysis['file']}: {analysis['error']}")
+    for path, reason in skipped:
+        st.caption(f"Skipped {path}: {reason}")
 
-    # Normalize offline results
-    for r in results_offline:
-        if "ai_feedback" in r:
-            r["feedback"] = r.pop("ai_feedback")
+    if not analyses:
+        st.stop()
+
+    df_issues = issue_frame(analyses)
 
     # -----------------------------------
     # TABS
@@ -71,29 +162,30 @@ if uploaded_file:
     with tab1:
         st.subheader("📊 Code Structure Metrics")
 
-        try:
-            tree = ast.parse(code)
-        except:
-            st.error("Syntax Error in Uploaded File")
-            st.stop()
+        df_files = pd.DataFrame(
+            [{"file": analysis["file"], **analysis["structure"]} for analysis in analyses]
+        )
+        issue_totals = df_issues.groupby("file").size()
+        df_files["total_issues"] = df_files["file"].map(issue_totals).fillna(0).astype(int)
 
-        num_functions = sum(isinstance(n, ast.FunctionDef) for n in ast.walk(tree))
-        num_classes = sum(isinstance(n, ast.ClassDef) for n in ast.walk(tree))
-        num_loops = sum(isinstance(n, (ast.For, ast.While)) for n in ast.walk(tree))
-        num_conditionals = sum(isinstance(n, ast.If) for n in ast.walk(tree))
+        totals = df_files[list(STRUCTURE_METRICS)].sum()
 
-        col1, col2, col3, col4, col5 = st.columns(5)
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
 
-        col1.metric("Functions", num_functions)
-        col2.metric("Classes", num_classes)
-        col3.metric("Loops", num_loops)
-        col4.metric("Conditionals", num_conditionals)
-        col5.metric("Total Issues", len(results_offline))
+        col1.metric("Files", len(df_files))
+        col2.metric("Functions", int(totals["functions"]))
+        col3.metric("Classes", int(totals["classes"]))
+        col4.metric("Loops", int(totals["loops"]))
+        col5.metric("Conditionals", int(totals["conditionals"]))
+        col6.metric("Total Issues", len(df_issues))
 
-        if len(results_offline) == 0:
+        if df_issues.empty:
             st.success("✅ No issues detected")
         else:
-            st.warning(f"⚠️ {len(results_offline)} issues detected")
+            st.warning(f"⚠️ {len(df_issues)} issues detected")
+
+        if len(df_files) > 1:
+            st.dataframe(df_files, use_container_width=True)
 
     # =====================================
     # TAB 2 — AI REVIEW
@@ -101,24 +193,67 @@ if uploaded_file:
     with tab2:
         st.subheader("🤖 AI Code Review")
 
-        if not issues:
+        # One file at a time, so a large upload does not flood Ollama
+        reviewable = [analysis for analysis in analyses if analysis["records"]]
+
+        if not reviewable:
             st.success("🎉 No issues detected")
         else:
-            try:
-                with st.spinner("Generating AI feedback via Ollama..."):
-                    results_ai = build_results_with_ai(issues, code)
-
-                # Normalize AI results
-                for r in results_ai:
-                    if "ai_feedback" in r:
-                        r["feedback"] = r.pop("ai_feedback")
+            selected = st.selectbox(
+                "File",
+                range(len(reviewable)),
+                format_func=lambda index: reviewable[index]["file"]
+            )
+            analysis = reviewable[selected]
+            issues = list(issue_counts(analysis["records"]))
+            code = code_by_file[analysis["file"]].decode("utf-8")
 
-                df = pd.DataFrame(results_ai)
+            try:
+                ai_store = ai_result_store()
+                answered = {}
+                for issue in issues:
+                    cached = ai_store.get((analysis["digest"], DEFAULT_MODEL, issue))
+                    if cached is not None:
+                        answered[issue] = cached
+
+                missing = [issue for issue in issues if issue not in answered]
+                events = stream_results_with_ai(
+                    missing, code,
+                    spans=issue_spans(analysis["records"]),
+                    scopes=issue_scopes(analysis["records"])
+                ) if missing else ()
+                feedback_box = None
+                feedback_text = ""
+
+                # Render feedback as it streams in, one block per issue;
+                # issues answered on an earlier run are not asked again
+                for kind, issue, payload in events:
+                    if kind == "start":
+                        st.markdown(f"**{issue}** · {payload}")
+                        feedback_box = st.empty()
+                        feedback_text = ""
+                    elif kind == "token":
+                        feedback_text += payload
+                        feedback_box.markdown(feedback_text)
+                    else:
+                        if "ai_feedback" in payload:
+                            payload["feedback"] = payload.pop("ai_feedback")
+                        answered[issue] = payload
+
+                        # Only real answers are kept, so an issue that
+                        # failed is retried on the next rerun
+                        if is_cacheable([payload]):
+                            ai_store[(analysis["digest"], DEFAULT_MODEL, issue)] = payload
+
+                while len(ai_store) > MAX_CACHED_AI_RESULTS:
+                    ai_store.pop(next(iter(ai_store)), None)
+
+                df = pd.DataFrame([answered[issue] for issue in issues])
                 st.dataframe(df, use_container_width=True)
 
             except Exception as e:
                 st.error("⚠️ AI server unavailable. Showing offline results instead.")
-                df = pd.DataFrame(results_offline)
+                df = df_issues[df_issues["file"] == analysis["file"]]
                 st.dataframe(df, use_container_width=True)
 
     # =====================================
@@ -127,13 +262,11 @@ if uploaded_file:
     with tab3:
         st.subheader("📈 Issue Analytics Dashboard")
 
-        if not results_offline:
+        if df_issues.empty:
             st.info("No issues detected.")
         else:
-            df = pd.DataFrame(results_offline)
-
             # Severity Chart
-            severity_counts = df["severity"].value_counts().reset_index()
+            severity_counts = df_issues.groupby("severity").size().reset_index(name="Count")
             severity_counts.columns = ["Severity", "Count"]
 
             col1, col2 = st.columns(2)
@@ -158,11 +291,15 @@ if uploaded_file:
                 st.plotly_chart(fig_pie, use_container_width=True)
 
             # Issue Types
-            issue_counts = df["issue"].value_counts().reset_index()
-            issue_counts.columns = ["Issue", "Count"]
+            issue_type_counts = (
+                df_issues.groupby("issue").size()
+                .sort_values(ascending=False)
+                .reset_index(name="Count")
+            )
+            issue_type_counts.columns = ["Issue", "Count"]
 
             fig_issue = px.bar(
-                issue_counts,
+                issue_type_counts,
                 x="Issue",
                 y="Count",
                 title="Issue Type Distribution",
@@ -171,22 +308,55 @@ if uploaded_file:
 
             st.plotly_chart(fig_issue, use_container_width=True)
 
+            # Issues per file, split by severity
+            if df_issues["file"].nunique() > 1:
+                file_counts = df_issues.groupby(["file", "severity"]).size().reset_index(name="Count")
+
+                fig_files = px.bar(
+                    file_counts,
+                    x="file",
+                    y="Count",
+                    color="severity",
+                    title="Issues per File"
+                )
+                st.plotly_chart(fig_files, use_container_width=True)
+
     # =====================================
     # TAB 4 — REPORT
     # =====================================
     with tab4:
         st.subheader("📁 Export Report")
 
-        if results_offline:
-
-            summary = aggregate_module3_results(results_offline, tmp_path)
-
-            st.json(summary)
-
-            df = pd.DataFrame(results_offline)
+        if not df_issues.empty:
+
+            records = df_issues.to_dict("records")
+            by_file = {}
+            for record in records:
+                by_file.setdefault(record["file"], []).append(record)
+
+            summaries = [
+                aggregate_module3_results(by_file.get(analysis["file"], []), analysis["file"])
+                for analysis in analyses
+            ]
+
+            if len(summaries) == 1:
+                st.json(summaries[0])
+            else:
+                table = IssueTable()
+                for analysis in analyses:
+                    table.add_file(
+                        analysis["file"],
+                        ((record.rule, record.severity) for record in analysis["records"])
+                    )
+                rollup = summarize_project(table)
+
+                st.json(rollup["project"])
+                st.dataframe(pd.DataFrame(summaries), use_container_width=True)
+                st.dataframe(pd.DataFrame(rollup["directories"]), use_container_width=True)
+                st.dataframe(pd.DataFrame(rollup["rules"]), use_container_width=True)
 
             # CSV with feedback
-            csv_data = df.to_csv(index=False).encode("utf-8")
+            csv_data = df_issues.to_csv(index=False).encode("utf-8")
 
             st.download_button(
                 label="⬇ Download CSV Report",
@@ -198,8 +368,5 @@ if uploaded_file:
         else:
             st.info("No issues to export.")
 
-    # Clean temp file
-    os.unlink(tmp_path)
-
 else:
-    st.info("Upload a Python file to begin analysis.")
+    st.info("Upload Python files or a zip archive to begin analysis.")